@@ -41,6 +41,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # Opt-in via DNAC_PROFILE_SAMPLE_PERCENT / DNAC_PROFILE_SLOW_MS, see dna_center_cisco/dnac_profiling.py
+    'dna_center_cisco.dnac_profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
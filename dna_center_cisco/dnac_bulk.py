@@ -0,0 +1,60 @@
+"""
+Concurrent fetch engine for bulk DNA Center operations.
+
+Interface lookups are issued from a thread pool through the manager's
+transport, which reuses pooled HTTPS connections (see dnac_transport).
+Results are yielded as soon as each device completes so callers can
+stream them out. Only a small window of requests is queued ahead of the
+consumer, so stopping the iteration early leaves the remaining devices
+unrequested.
+"""
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from itertools import islice
+
+from .dnac_transport import pooled_session
+
+DEFAULT_WORKERS = 8
+
+# Requests queued per worker ahead of the consumer
+QUEUE_FACTOR = 2
+
+
+def fetch_interfaces(dnac, devices, workers=DEFAULT_WORKERS, progress=None):
+    """Yields (device, interfaces, error) for each device as it completes
+
+    ``progress`` is called with (completed, total) after every device.
+    """
+    devices = list(devices)
+    total = len(devices)
+    workers = max(1, workers)
+    # Keep one pooled connection per worker so requests do not queue on the pool
+    pooled_session(min_size=workers)
+
+    pending = iter(devices)
+    futures = {}
+    executor = ThreadPoolExecutor(max_workers=workers)
+
+    def submit(count):
+        for device in islice(pending, count):
+            futures[executor.submit(dnac.get_interfaces_by_device_id, device['id'])] = device
+
+    try:
+        submit(workers * QUEUE_FACTOR)
+        completed = 0
+        while futures:
+            done, _ = wait(futures, return_when=FIRST_COMPLETED)
+            submit(len(done))
+            for future in done:
+                device = futures.pop(future)
+                completed += 1
+                try:
+                    result = (device, future.result(), None)
+                except Exception as e:
+                    result = (device, None, e)
+                yield result
+                if progress:
+                    progress(completed, total)
+    finally:
+        # Reached on GeneratorExit too: drop queued requests instead of waiting for them
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,309 @@
+"""
+Configuration compliance diffing over cached inventory snapshots.
+
+A snapshot stores the compliance-relevant fields of every device and its
+interfaces together with a per-device hash. Diffing two snapshots only
+inspects devices whose hash changed. Devices whose interfaces could not be
+fetched are listed under "failed" and left out of comparisons instead of
+being reported as drift. A snapshot can also be checked against a
+declared baseline, for example:
+
+    {
+        "defaults": {"adminStatus": "UP", "speed": "1000000"},
+        "devices": {
+            "10.10.20.81": {"interfaces": {"GigabitEthernet1/0/1": {"vlanId": "10"}}}
+        }
+    }
+
+Device entries in a baseline are matched by hostname or management IP.
+"""
+
+import csv
+import hashlib
+import io
+import json
+import os
+from datetime import datetime
+
+from .dnac_bulk import DEFAULT_WORKERS, fetch_interfaces
+from .dnac_storage import read_json, write_json
+
+DEVICE_FIELDS = ('hostname', 'managementIpAddress', 'platformId',
+                 'softwareVersion', 'reachabilityStatus')
+INTERFACE_FIELDS = ('status', 'adminStatus', 'vlanId', 'speed', 'duplex')
+
+
+def snapshot_dir():
+    """Returns the directory holding snapshots and reports"""
+    path = os.environ.get('DNAC_SNAPSHOT_DIR', 'snapshots')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _hash_record(record):
+    return hashlib.sha1(
+        json.dumps(record, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    ).hexdigest()
+
+
+def _device_record(device, interfaces):
+    """Keeps only the fields the compliance checks look at"""
+    record = {field: device.get(field) for field in DEVICE_FIELDS}
+    record['interfaces'] = {
+        intf.get('portName') or intf.get('id'): {field: intf.get(field) for field in INTERFACE_FIELDS}
+        for intf in interfaces or []
+    }
+    return record
+
+
+def build_snapshot(inventory, failed=None):
+    """Builds a snapshot from an iterable of (device, interfaces) pairs
+
+    ``failed`` maps the ids of devices that could not be fetched to an
+    error description; they are excluded from later comparisons.
+    """
+    devices = {}
+    hashes = {}
+    for device, interfaces in inventory:
+        record = _device_record(device, interfaces)
+        devices[device['id']] = record
+        hashes[device['id']] = _hash_record(record)
+    now = datetime.utcnow()
+    return {
+        "id": now.strftime('%Y%m%dT%H%M%S%fZ'),
+        "taken_at": now.isoformat(),
+        "devices": devices,
+        "hashes": hashes,
+        "failed": failed or {}
+    }
+
+
+def take_snapshot(dnac, workers=DEFAULT_WORKERS, progress=None, retries=1):
+    """Fetches the full inventory through an authenticated DNAC_Manager
+
+    Devices whose interfaces fail are retried ``retries`` times and then
+    recorded in the snapshot's "failed" section.
+    """
+    devices = dnac.get_network_devices()
+    if devices is None:
+        return None
+
+    inventory = []
+    pending = devices
+    failed = {}
+    for attempt in range(retries + 1):
+        failed_devices = []
+        failed = {}
+        for device, interfaces, error in fetch_interfaces(dnac, pending, workers, progress):
+            if error is not None:
+                failed_devices.append(device)
+                failed[device['id']] = {
+                    "hostname": device.get('hostname'),
+                    "ip_address": device.get('managementIpAddress'),
+                    "error": str(error)
+                }
+                continue
+            inventory.append((device, interfaces))
+        if not failed_devices:
+            break
+        pending = failed_devices
+    return build_snapshot(inventory, failed)
+
+
+def save_snapshot(snapshot):
+    write_json(os.path.join(snapshot_dir(), f"snapshot-{snapshot['id']}.json.gz"), snapshot)
+    return snapshot['id']
+
+
+def load_snapshot(snapshot_id):
+    return read_json(os.path.join(snapshot_dir(), f"snapshot-{os.path.basename(snapshot_id)}.json.gz"))
+
+
+def save_report(report):
+    write_json(os.path.join(snapshot_dir(), f"report-{report['id']}.json.gz"), report)
+    return report['id']
+
+
+def load_report(report_id):
+    return read_json(os.path.join(snapshot_dir(), f"report-{os.path.basename(report_id)}.json.gz"))
+
+
+def _list(prefix):
+    names = [
+        name[len(prefix):-len('.json.gz')]
+        for name in os.listdir(snapshot_dir())
+        if name.startswith(prefix) and name.endswith('.json.gz')
+    ]
+    return sorted(names, reverse=True)
+
+
+def list_snapshots():
+    return _list('snapshot-')
+
+
+def list_reports():
+    return _list('report-')
+
+
+def diff_device(old, new):
+    """Returns the changes between two records of the same device"""
+    changes = []
+    for field in ('softwareVersion', 'reachabilityStatus', 'platformId'):
+        if old.get(field) != new.get(field):
+            changes.append({"port": None, "kind": f"{field}_changed",
+                            "old": old.get(field), "new": new.get(field)})
+
+    old_intfs = old.get('interfaces', {})
+    new_intfs = new.get('interfaces', {})
+    for port in sorted(set(old_intfs) | set(new_intfs)):
+        before = old_intfs.get(port)
+        after = new_intfs.get(port)
+        if before is None:
+            changes.append({"port": port, "kind": "interface_added", "old": None, "new": after})
+            continue
+        if after is None:
+            changes.append({"port": port, "kind": "interface_removed", "old": before, "new": None})
+            continue
+        if before == after:
+            continue
+        if before.get('vlanId') != after.get('vlanId'):
+            changes.append({"port": port, "kind": "vlan_changed",
+                            "old": before.get('vlanId'), "new": after.get('vlanId')})
+        if before.get('speed') != after.get('speed') or before.get('duplex') != after.get('duplex'):
+            changes.append({"port": port, "kind": "speed_changed",
+                            "old": before.get('speed'), "new": after.get('speed')})
+        if before.get('adminStatus') != after.get('adminStatus'):
+            kind = "admin_down" if str(after.get('adminStatus')).upper() == 'DOWN' else "admin_up"
+            changes.append({"port": port, "kind": kind,
+                            "old": before.get('adminStatus'), "new": after.get('adminStatus')})
+        if before.get('status') != after.get('status'):
+            changes.append({"port": port, "kind": "status_changed",
+                            "old": before.get('status'), "new": after.get('status')})
+    return changes
+
+
+def check_device(record, expected):
+    """Returns the deviations of a device record from its baseline"""
+    defaults = expected.get('defaults', {})
+    ports = expected.get('interfaces', {})
+    interfaces = record.get('interfaces', {})
+    changes = []
+
+    for port in sorted(set(interfaces) | set(ports)):
+        actual = interfaces.get(port)
+        if actual is None:
+            changes.append({"port": port, "kind": "missing_interface", "old": ports[port], "new": None})
+            continue
+        wanted = dict(defaults, **ports.get(port, {}))
+        for field, value in sorted(wanted.items()):
+            if str(actual.get(field)) == str(value):
+                continue
+            if field == 'adminStatus' and str(actual.get(field)).upper() == 'DOWN':
+                kind = "admin_down"
+            elif field in ('speed', 'duplex'):
+                kind = "speed_mismatch"
+            elif field == 'vlanId':
+                kind = "vlan_mismatch"
+            else:
+                kind = f"{field}_mismatch"
+            changes.append({"port": port, "kind": kind, "old": value, "new": actual.get(field)})
+    return changes
+
+
+def _report(mode, sources, checked, unchanged, device_changes, records, skipped):
+    devices = []
+    for device_id, changes in device_changes:
+        if not changes:
+            continue
+        record = records.get(device_id, {})
+        devices.append({
+            "id": device_id,
+            "hostname": record.get('hostname'),
+            "ip_address": record.get('managementIpAddress'),
+            "changes": changes
+        })
+    devices.sort(key=lambda d: (d['hostname'] or '', d['id']))
+    now = datetime.utcnow()
+    return {
+        "id": now.strftime('%Y%m%dT%H%M%S%fZ'),
+        "generated_at": now.isoformat(),
+        "mode": mode,
+        "sources": sources,
+        "summary": {
+            "devices_checked": checked,
+            "devices_unchanged": unchanged,
+            "devices_changed": len(devices),
+            "devices_skipped": len(skipped),
+            "changes": sum(len(d['changes']) for d in devices)
+        },
+        "devices": devices,
+        "skipped": [dict(info, id=device_id) for device_id, info in sorted(skipped.items())]
+    }
+
+
+def diff_snapshots(old, new):
+    """Compares two snapshots, skipping devices whose hash is unchanged
+
+    Devices that failed in either snapshot are reported as skipped rather
+    than as added or removed.
+    """
+    skipped = dict(old.get('failed', {}), **new.get('failed', {}))
+    old_hashes = {k: v for k, v in old.get('hashes', {}).items() if k not in skipped}
+    new_hashes = {k: v for k, v in new.get('hashes', {}).items() if k not in skipped}
+    records = dict(old['devices'], **new['devices'])
+
+    device_changes = []
+    for device_id in set(old_hashes) - set(new_hashes):
+        device_changes.append((device_id, [{"port": None, "kind": "device_removed", "old": None, "new": None}]))
+    for device_id in set(new_hashes) - set(old_hashes):
+        device_changes.append((device_id, [{"port": None, "kind": "device_added", "old": None, "new": None}]))
+
+    common = set(old_hashes) & set(new_hashes)
+    changed = [device_id for device_id in common if old_hashes[device_id] != new_hashes[device_id]]
+    for device_id in changed:
+        device_changes.append((device_id, diff_device(old['devices'][device_id], new['devices'][device_id])))
+
+    return _report("diff", [old['id'], new['id']], len(common),
+                   len(common) - len(changed), device_changes, records, skipped)
+
+
+def check_baseline(snapshot, baseline):
+    """Compares a snapshot against a declared baseline"""
+    defaults = baseline.get('defaults', {})
+    declared = baseline.get('devices', {})
+
+    device_changes = []
+    for device_id, record in snapshot['devices'].items():
+        device_baseline = declared.get(record.get('hostname')) or declared.get(record.get('managementIpAddress')) or {}
+        expected = {
+            "defaults": dict(defaults, **device_baseline.get('defaults', {})),
+            "interfaces": device_baseline.get('interfaces', {})
+        }
+        device_changes.append((device_id, check_device(record, expected)))
+
+    unchanged = sum(1 for _, changes in device_changes if not changes)
+    return _report("baseline", [snapshot['id']], len(device_changes), unchanged,
+                   device_changes, snapshot['devices'], snapshot.get('failed', {}))
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, dict):
+        return json.dumps(value, sort_keys=True)
+    return value
+
+
+def report_to_csv(report):
+    """Flattens a report into CSV text, one row per change"""
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(['device_id', 'hostname', 'ip_address', 'port', 'kind', 'old', 'new'])
+    for device in report['devices']:
+        for change in device['changes']:
+            writer.writerow([
+                device['id'], device['hostname'], device['ip_address'],
+                change['port'] or '', change['kind'],
+                _csv_value(change['old']), _csv_value(change['new'])
+            ])
+    return output.getvalue()
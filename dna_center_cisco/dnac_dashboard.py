@@ -0,0 +1,251 @@
+"""
+Incrementally maintained dashboard aggregates.
+
+The dashboard reads a single summary document, so it renders in constant
+time whatever the size of the fabric. The summary is kept current by the
+inventory refreshes themselves: every device and every device's interface
+list has a contribution document recording what it last added to the
+counters. On refresh only the difference between the old and the new
+contribution is added to the summary with ``$inc``.
+
+Each contribution carries a revision number and is only replaced while
+its revision is still the one the delta was computed from. When another worker
+changed it in between, the contribution is read again and the delta
+recomputed, so every delta applied to the summary matches exactly one
+change of a contribution. A refresh that fails midway still adds the
+changes it made to the summary. If a process dies between the two writes,
+``rebuild_summary`` recomputes the summary from the contributions.
+
+Documents in the dashboard collection (MONGODB_DASHBOARD_COLLECTION,
+default "dashboard"):
+
+    {"_id": "summary", "devices": 12, "reachability": {...}, "platform": {...},
+     "version": {...}, "vlan_up": {...}, "vlan_down": {...}, "updated_at": ...}
+    {"_id": "device:<id>", "revision": 3, "reachability": ..., "platform": ..., "version": ...}
+    {"_id": "interfaces:<id>", "revision": 1, "vlan_up": {...}, "vlan_down": {...}}
+"""
+
+import os
+from collections import Counter
+from datetime import datetime
+
+from pymongo.errors import DuplicateKeyError
+
+from .dnac_mongo import db
+
+SUMMARY_ID = 'summary'
+DEVICE_FIELDS = {
+    'reachability': 'reachabilityStatus',
+    'platform': 'platformId',
+    'version': 'softwareVersion'
+}
+
+# Attempts to replace a contribution that other workers keep changing
+MAX_ATTEMPTS = 5
+
+dashboard_collection = (
+    db[os.environ.get('MONGODB_DASHBOARD_COLLECTION', 'dashboard')] if db is not None else None
+)
+
+
+def _encode(value):
+    """Makes a value usable as a MongoDB field name"""
+    value = str(value) if value not in (None, '') else 'Unknown'
+    return value.replace('.', '．').replace('$', '＄')
+
+
+def _decode(key):
+    return key.replace('．', '.').replace('＄', '$')
+
+
+def _device_contribution(device):
+    return {group: _encode(device.get(field)) for group, field in DEVICE_FIELDS.items()}
+
+
+def _interface_contribution(interfaces):
+    up = Counter()
+    down = Counter()
+    for intf in interfaces or []:
+        vlan = _encode(intf.get('vlanId') or 'None')
+        if str(intf.get('status', '')).lower() == 'up':
+            up[vlan] += 1
+        else:
+            down[vlan] += 1
+    return {"vlan_up": dict(up), "vlan_down": dict(down)}
+
+
+def _device_delta(delta, contribution, sign):
+    delta['devices'] += sign
+    for group in DEVICE_FIELDS:
+        delta[f"{group}.{contribution[group]}"] += sign
+
+
+def _interface_delta(delta, contribution, sign):
+    for group in ('vlan_up', 'vlan_down'):
+        for vlan, count in contribution.get(group, {}).items():
+            delta[f"{group}.{vlan}"] += sign * count
+
+
+def _stored(doc):
+    """Returns the contribution held by a document, without _id and revision"""
+    if doc is None:
+        return None
+    return {key: value for key, value in doc.items() if key not in ('_id', 'revision')}
+
+
+def _swap(doc_id, old, new, contribute):
+    """Replaces contribution document ``old`` by ``new`` (None deletes it)
+
+    Returns the summary delta, or None when another worker changed the
+    document since ``old`` was read.
+    """
+    delta = Counter()
+    if _stored(old) == new:
+        return delta
+    if old is not None:
+        contribute(delta, _stored(old), -1)
+    if new is not None:
+        contribute(delta, new, 1)
+
+    try:
+        if old is None:
+            dashboard_collection.insert_one(dict(new, _id=doc_id, revision=1))
+            return delta
+        expected = {"_id": doc_id, "revision": old.get('revision')}
+        if new is None:
+            result = dashboard_collection.delete_one(expected)
+            return delta if result.deleted_count else None
+        result = dashboard_collection.replace_one(
+            expected, dict(new, revision=(old.get('revision') or 0) + 1)
+        )
+        return delta if result.matched_count else None
+    except DuplicateKeyError:
+        return None
+
+
+def _update(doc_id, old, new, contribute):
+    """Swaps in a contribution, re-reading it after concurrent changes"""
+    for attempt in range(MAX_ATTEMPTS):
+        delta = _swap(doc_id, old, new, contribute)
+        if delta is not None:
+            return delta
+        old = dashboard_collection.find_one({"_id": doc_id})
+    print(f" ⚠️  Dashboard contribution {doc_id} kept changing, skipped")
+    return Counter()
+
+
+def _apply(delta):
+    changes = {field: count for field, count in delta.items() if count}
+    update = {"$set": {"updated_at": datetime.utcnow()}}
+    if changes:
+        update["$inc"] = changes
+    dashboard_collection.update_one({"_id": SUMMARY_ID}, update, upsert=True)
+
+
+def record_devices(devices):
+    """Applies a full device inventory refresh to the aggregates"""
+    if dashboard_collection is None:
+        return
+
+    previous = {
+        doc['_id'][len('device:'):]: doc
+        for doc in dashboard_collection.find({"_id": {"$regex": "^device:"}})
+    }
+    delta = Counter()
+
+    # Contributions swapped before an error must still reach the summary,
+    # later refreshes see them as unchanged
+    try:
+        for device in devices:
+            device_id = device.get('id')
+            if not device_id:
+                continue
+            delta.update(_update(f"device:{device_id}", previous.pop(device_id, None),
+                                 _device_contribution(device), _device_delta))
+
+        # Devices no longer in the inventory take their interfaces with them
+        if previous:
+            removed_interfaces = dashboard_collection.find(
+                {"_id": {"$in": [f"interfaces:{device_id}" for device_id in previous]}}
+            )
+            for doc in removed_interfaces:
+                delta.update(_update(doc['_id'], doc, None, _interface_delta))
+            for device_id, old in previous.items():
+                delta.update(_update(f"device:{device_id}", old, None, _device_delta))
+    finally:
+        _apply(delta)
+
+
+def record_interfaces(device_id, interfaces):
+    """Applies a refreshed interface list of one device to the aggregates"""
+    if dashboard_collection is None or not device_id:
+        return
+
+    doc_id = f"interfaces:{device_id}"
+    old = dashboard_collection.find_one({"_id": doc_id})
+    delta = _update(doc_id, old, _interface_contribution(interfaces), _interface_delta)
+    if delta:
+        _apply(delta)
+
+
+def rebuild_summary():
+    """Recomputes the summary from the contribution documents
+
+    Repairs the counters after a process died between updating a
+    contribution and the summary. Refreshes running at the same time may
+    be counted twice, so run it while the inventory is not being refreshed.
+    """
+    if dashboard_collection is None:
+        return None
+
+    totals = Counter()
+    for doc in dashboard_collection.find({"_id": {"$regex": "^(device|interfaces):"}}):
+        if doc['_id'].startswith('device:'):
+            _device_delta(totals, _stored(doc), 1)
+        else:
+            _interface_delta(totals, _stored(doc), 1)
+
+    summary = {"devices": totals.pop('devices', 0), "updated_at": datetime.utcnow()}
+    for group in list(DEVICE_FIELDS) + ['vlan_up', 'vlan_down']:
+        summary[group] = {}
+    for field, count in totals.items():
+        group, key = field.split('.', 1)
+        if count:
+            summary[group][key] = count
+    dashboard_collection.replace_one({"_id": SUMMARY_ID}, summary, upsert=True)
+    return get_summary()
+
+
+def _ranked(counts):
+    return sorted(
+        ((_decode(key), count) for key, count in (counts or {}).items() if count > 0),
+        key=lambda item: (-item[1], item[0])
+    )
+
+
+def get_summary():
+    """Returns the dashboard summary, or None when nothing is recorded yet"""
+    if dashboard_collection is None:
+        return None
+    summary = dashboard_collection.find_one({"_id": SUMMARY_ID})
+    if summary is None:
+        return None
+
+    up = summary.get('vlan_up', {})
+    down = summary.get('vlan_down', {})
+    vlans = []
+    for key in set(up) | set(down):
+        if up.get(key, 0) > 0 or down.get(key, 0) > 0:
+            vlans.append({"vlan": _decode(key), "up": up.get(key, 0), "down": down.get(key, 0)})
+    vlans.sort(key=lambda v: (not v['vlan'].isdigit(), int(v['vlan']) if v['vlan'].isdigit() else 0, v['vlan']))
+
+    return {
+        "devices": summary.get('devices', 0),
+        "reachability": _ranked(summary.get('reachability')),
+        "platforms": _ranked(summary.get('platform')),
+        "versions": _ranked(summary.get('version')),
+        "vlans": vlans,
+        "interfaces_up": sum(v['up'] for v in vlans),
+        "interfaces_down": sum(v['down'] for v in vlans),
+        "updated_at": summary.get('updated_at')
+    }
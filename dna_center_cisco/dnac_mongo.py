@@ -0,0 +1,239 @@
+"""
+MongoDB connection used for operation logging.
+
+The client is built from environment variables:
+
+    MONGODB_URI=mongodb://a,b,c/?replicaSet=rs0   # overrides host/port
+    MONGODB_HOST=localhost
+    MONGODB_PORT=27017
+    MONGODB_DB=assignment9
+    MONGODB_COLLECTION=logs
+    MONGODB_REPLICA_SET=rs0
+    MONGODB_MIN_POOL_SIZE=0
+    MONGODB_MAX_POOL_SIZE=100
+    MONGODB_LOG_WRITE_CONCERN=1                   # 0 = fire-and-forget audit logs, or majority
+    MONGODB_LOG_READ_PREFERENCE=secondaryPreferred
+    MONGODB_COMPRESSORS=zstd,snappy
+    MONGODB_SERVER_SELECTION_TIMEOUT_MS=30000
+
+Log writes go to the primary with the configured write concern, while the
+logs page reads through ``logs_read_collection`` so it can be served by a
+secondary instead of competing with writes. ``pool_metrics`` tracks the
+connection pool through pymongo's monitoring API. Invalid values fall
+back to their default with a warning rather than disabling MongoDB.
+"""
+
+import importlib.util
+import os
+import threading
+
+import pymongo
+from pymongo import ReadPreference, monitoring
+from pymongo.write_concern import WriteConcern
+
+# Compressors and the package pymongo needs for each of them
+COMPRESSOR_PACKAGES = {
+    'zstd': 'zstandard',
+    'snappy': 'snappy',
+    'zlib': 'zlib'
+}
+
+# Accepted MONGODB_LOG_READ_PREFERENCE values
+READ_PREFERENCES = {
+    'primary': ReadPreference.PRIMARY,
+    'primaryPreferred': ReadPreference.PRIMARY_PREFERRED,
+    'secondary': ReadPreference.SECONDARY,
+    'secondaryPreferred': ReadPreference.SECONDARY_PREFERRED,
+    'nearest': ReadPreference.NEAREST
+}
+
+def _non_negative_int(value):
+    number = int(value)
+    if number < 0:
+        raise ValueError(value)
+    return number
+
+
+# Environment variable, MongoClient option and value type
+CLIENT_OPTIONS = (
+    ('MONGODB_REPLICA_SET', 'replicaSet', str),
+    ('MONGODB_MIN_POOL_SIZE', 'minPoolSize', _non_negative_int),
+    ('MONGODB_MAX_POOL_SIZE', 'maxPoolSize', _non_negative_int),
+    ('MONGODB_SERVER_SELECTION_TIMEOUT_MS', 'serverSelectionTimeoutMS', _non_negative_int)
+)
+
+
+class PoolMetrics(monitoring.ConnectionPoolListener):
+    """Counts connection pool events for every server"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pools = {}
+
+    def _pool(self, address):
+        key = f"{address[0]}:{address[1]}"
+        pool = self.pools.get(key)
+        if pool is None:
+            pool = self.pools[key] = {
+                "open": 0,
+                "checked_out": 0,
+                "created": 0,
+                "closed": 0,
+                "checkouts": 0,
+                "checkout_failures": 0,
+                "cleared": 0,
+                "max_checkout_ms": 0.0,
+                "total_checkout_ms": 0.0
+            }
+        return pool
+
+    def _update(self, event, **changes):
+        with self.lock:
+            pool = self._pool(event.address)
+            for field, delta in changes.items():
+                pool[field] += delta
+
+    def snapshot(self):
+        """Returns a copy of the counters with the average checkout wait"""
+        with self.lock:
+            pools = {}
+            for address, pool in self.pools.items():
+                pool = dict(pool)
+                checkouts = pool.pop('total_checkout_ms')
+                pool['avg_checkout_ms'] = round(checkouts / pool['checkouts'], 3) if pool['checkouts'] else 0.0
+                pool['max_checkout_ms'] = round(pool['max_checkout_ms'], 3)
+                pools[address] = pool
+            return pools
+
+    def pool_created(self, event):
+        self._update(event)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._update(event, cleared=1)
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._update(event, created=1, open=1)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._update(event, closed=1, open=-1)
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self._update(event, checkout_failures=1)
+
+    def connection_checked_out(self, event):
+        # The wait time is only reported by pymongo 4.7 and later
+        duration_ms = (getattr(event, 'duration', None) or 0) * 1000
+        with self.lock:
+            pool = self._pool(event.address)
+            pool['checkouts'] += 1
+            pool['checked_out'] += 1
+            pool['total_checkout_ms'] += duration_ms
+            pool['max_checkout_ms'] = max(pool['max_checkout_ms'], duration_ms)
+
+    def connection_checked_in(self, event):
+        self._update(event, checked_out=-1)
+
+
+def _compressors():
+    """Returns the requested compressors whose packages are installed"""
+    requested = [c.strip() for c in os.environ.get('MONGODB_COMPRESSORS', '').split(',') if c.strip()]
+    available = []
+    for compressor in requested:
+        package = COMPRESSOR_PACKAGES.get(compressor)
+        if package is None or importlib.util.find_spec(package) is None:
+            print(f" ⚠️  MongoDB compressor '{compressor}' is not available, skipping")
+            continue
+        available.append(compressor)
+    return available
+
+
+def log_write_concern():
+    """Returns the write concern for log inserts from MONGODB_LOG_WRITE_CONCERN"""
+    value = os.environ.get('MONGODB_LOG_WRITE_CONCERN', '1').strip()
+    if value == 'majority':
+        return WriteConcern(w='majority')
+    try:
+        w = int(value)
+        if w < 0:
+            raise ValueError(value)
+    except ValueError:
+        print(f" ⚠️  Invalid MONGODB_LOG_WRITE_CONCERN '{value}', using 1")
+        w = 1
+    return WriteConcern(w=w)
+
+
+def log_read_preference():
+    """Returns the read preference for the logs page from MONGODB_LOG_READ_PREFERENCE"""
+    name = os.environ.get('MONGODB_LOG_READ_PREFERENCE', 'secondaryPreferred').strip()
+    read_preference = READ_PREFERENCES.get(name)
+    if read_preference is None:
+        print(f" ⚠️  Invalid MONGODB_LOG_READ_PREFERENCE '{name}', using secondaryPreferred")
+        read_preference = ReadPreference.SECONDARY_PREFERRED
+    return read_preference
+
+
+def client_options():
+    """Returns the MongoClient options set through environment variables
+
+    Only what is set is returned so options given in MONGODB_URI are not
+    overridden. Invalid values are skipped with a warning.
+    """
+    options = {}
+    for variable, option, convert in CLIENT_OPTIONS:
+        value = os.environ.get(variable, '').strip()
+        if not value:
+            continue
+        try:
+            options[option] = convert(value)
+        except ValueError:
+            print(f" ⚠️  Invalid {variable} '{value}', using the default")
+    compressors = _compressors()
+    if compressors:
+        options['compressors'] = compressors
+    return options
+
+
+def create_client(pool_metrics=None, options=None):
+    """Builds a MongoClient from the environment variables"""
+    uri = os.environ.get('MONGODB_URI')
+    if not uri:
+        host = os.environ.get('MONGODB_HOST', 'localhost')
+        port = os.environ.get('MONGODB_PORT', '27017')
+        uri = f"mongodb://{host}:{port}/"
+
+    options = dict(client_options() if options is None else options)
+    if pool_metrics is not None:
+        options['event_listeners'] = [pool_metrics]
+    return pymongo.MongoClient(uri, **options)
+
+
+pool_metrics = PoolMetrics()
+mongo_options = client_options()
+write_concern = log_write_concern()
+read_preference = log_read_preference()
+
+try:
+    client = create_client(pool_metrics, mongo_options)
+    db = client[os.environ.get('MONGODB_DB', 'assignment9')]
+    mongo_collection = os.environ.get('MONGODB_COLLECTION', 'logs')
+
+    logs_collection = db.get_collection(mongo_collection, write_concern=write_concern)
+    logs_read_collection = db.get_collection(mongo_collection, read_preference=read_preference)
+except Exception as e:
+    print(f"Failed to connect to MongoDB: {str(e)}")
+    client = None
+    db = None
+    logs_collection = None
+    logs_read_collection = None
@@ -0,0 +1,215 @@
+"""
+Opt-in request profiling for the DNA Center views.
+
+ProfilingMiddleware samples a percentage of requests, or keeps every
+request slower than a threshold, and stores for each one the per-stage
+span timings (auth, fetch, decode, log, render) and the collapsed call
+stacks gathered by a low-overhead sampling profiler. Collapsed stacks can
+be fed straight into flamegraph.pl or speedscope.
+
+The middleware is disabled unless one of these is set:
+
+    DNAC_PROFILE_SAMPLE_PERCENT=5     # profile 5% of requests
+    DNAC_PROFILE_SLOW_MS=1000         # keep every request slower than 1s
+
+Optional: DNAC_PROFILE_DIR (default "profiles"), DNAC_PROFILE_INTERVAL_MS
+(sampling interval, default 5) and DNAC_PROFILE_KEEP (profiles retained,
+default 200, at least 1).
+"""
+
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+from django import shortcuts
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+
+from .dnac_storage import READ_ERRORS, read_json, write_json
+
+MAX_STACK_DEPTH = 128
+
+_local = threading.local()
+
+
+class RequestProfile:
+    """Span timings and stack samples collected for one request"""
+
+    def __init__(self):
+        self.spans = {}
+        self.stacks = Counter()
+        self.samples = 0
+
+    def add_span(self, name, seconds):
+        total, count = self.spans.get(name, (0.0, 0))
+        self.spans[name] = (total + seconds, count + 1)
+
+
+@contextmanager
+def span(name):
+    """Times a stage of the current request when it is being profiled"""
+    profile = getattr(_local, 'profile', None)
+    if profile is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profile.add_span(name, time.perf_counter() - start)
+
+
+def render(request, template_name, context=None, **kwargs):
+    """django.shortcuts.render, timed as the 'render' span"""
+    with span('render'):
+        return shortcuts.render(request, template_name, context, **kwargs)
+
+
+class _StackSampler(threading.Thread):
+    """Periodically records the call stack of every registered thread"""
+
+    def __init__(self, interval):
+        super().__init__(name='dnac-profile-sampler', daemon=True)
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.targets = {}
+
+    def register(self, ident, profile):
+        with self.lock:
+            self.targets[ident] = profile
+
+    def unregister(self, ident):
+        with self.lock:
+            self.targets.pop(ident, None)
+
+    def run(self):
+        while True:
+            time.sleep(self.interval)
+            with self.lock:
+                targets = list(self.targets.items())
+            if not targets:
+                continue
+            frames = sys._current_frames()
+            for ident, profile in targets:
+                frame = frames.get(ident)
+                stack = []
+                while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                    module = frame.f_globals.get('__name__', '?')
+                    stack.append(f"{module}:{frame.f_code.co_name}")
+                    frame = frame.f_back
+                if stack:
+                    profile.stacks[';'.join(reversed(stack))] += 1
+                    profile.samples += 1
+
+
+def profile_dir():
+    """Returns the directory holding stored profiles"""
+    path = os.environ.get('DNAC_PROFILE_DIR', 'profiles')
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def save_profile(record, keep=200):
+    """Stores a profile and prunes the oldest beyond ``keep``"""
+    if keep < 1:
+        raise ValueError(f"keep must be at least 1, got {keep}")
+    directory = profile_dir()
+    write_json(os.path.join(directory, f"profile-{record['id']}.json.gz"), record)
+
+    names = sorted(
+        name for name in os.listdir(directory)
+        if name.startswith('profile-') and name.endswith('.json.gz')
+    )
+    for name in names[:-keep]:
+        try:
+            os.remove(os.path.join(directory, name))
+        except OSError:
+            pass
+
+
+def load_profile(profile_id):
+    return read_json(os.path.join(profile_dir(), f"profile-{os.path.basename(profile_id)}.json.gz"))
+
+
+def list_profiles():
+    """Returns stored profiles, newest first, without their stacks"""
+    profiles = []
+    for name in sorted(os.listdir(profile_dir()), reverse=True):
+        if not name.startswith('profile-') or not name.endswith('.json.gz'):
+            continue
+        try:
+            record = load_profile(name[len('profile-'):-len('.json.gz')])
+        except READ_ERRORS:
+            # Unreadable, e.g. removed by pruning while listing
+            continue
+        record.pop('stacks', None)
+        profiles.append(record)
+    return profiles
+
+
+def collapsed_stacks(record):
+    """Formats a profile's stacks in the collapsed flamegraph format"""
+    return ''.join(f"{stack} {count}\n" for stack, count in sorted(record['stacks'].items()))
+
+
+class ProfilingMiddleware:
+    """Samples requests and stores their span timings and call stacks"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_percent = float(os.environ.get('DNAC_PROFILE_SAMPLE_PERCENT', '0'))
+        self.slow_ms = float(os.environ.get('DNAC_PROFILE_SLOW_MS', '0'))
+        self.keep = int(os.environ.get('DNAC_PROFILE_KEEP', '200'))
+        if self.keep < 1:
+            raise ImproperlyConfigured('DNAC_PROFILE_KEEP must be at least 1')
+        if self.sample_percent <= 0 and self.slow_ms <= 0:
+            raise MiddlewareNotUsed()
+
+        interval = float(os.environ.get('DNAC_PROFILE_INTERVAL_MS', '5')) / 1000
+        self.sampler = _StackSampler(interval)
+        self.sampler.start()
+
+    def __call__(self, request):
+        sampled = random.random() * 100 < self.sample_percent
+        if not sampled and self.slow_ms <= 0:
+            return self.get_response(request)
+
+        profile = RequestProfile()
+        ident = threading.get_ident()
+        _local.profile = profile
+        self.sampler.register(ident, profile)
+        started_at = datetime.utcnow()
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            self.sampler.unregister(ident)
+            _local.profile = None
+
+        slow = self.slow_ms > 0 and duration_ms >= self.slow_ms
+        if sampled or slow:
+            record = {
+                "id": started_at.strftime('%Y%m%dT%H%M%S%fZ'),
+                "timestamp": started_at.isoformat(),
+                "method": request.method,
+                "path": request.path,
+                "status": response.status_code,
+                "duration_ms": round(duration_ms, 2),
+                "reason": "slow" if slow else "sampled",
+                "spans": {
+                    name: {"ms": round(total * 1000, 2), "count": count}
+                    for name, (total, count) in profile.spans.items()
+                },
+                "samples": profile.samples,
+                "stacks": dict(profile.stacks)
+            }
+            try:
+                save_profile(record, self.keep)
+            except OSError as e:
+                print(f" ❌  Failed to store profile: {str(e)}")
+        return response
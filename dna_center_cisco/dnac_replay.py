@@ -0,0 +1,290 @@
+"""
+Record and replay transport for Cisco DNA Center API traffic.
+
+A cassette is a gzip-compressed JSON file holding the request/response
+pairs exchanged with DNA Center. Recording wraps the real ``requests``
+calls; replaying serves the stored responses (optionally with their
+original latency) so benchmarks and tests can run without network access.
+"""
+
+import atexit
+import gzip
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from urllib.parse import urlsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+CASSETTE_VERSION = 1
+
+
+class CassetteMiss(requests.ConnectionError):
+    """Raised when a replayed request has no recorded interaction"""
+
+
+def _request_key(method, url, params=None):
+    """Builds the host-independent lookup key for a request"""
+    path = urlsplit(url).path
+    params = sorted((str(k), str(v)) for k, v in (params or {}).items())
+    return json.dumps([method.upper(), path, params])
+
+
+def load_cassette(path):
+    """Reads a cassette file and returns its interactions"""
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        cassette = json.load(f)
+    return cassette.get('interactions', [])
+
+
+def save_cassette(path, interactions):
+    """Writes interactions to a cassette file"""
+    cassette = {
+        "version": CASSETTE_VERSION,
+        "recorded_at": datetime.utcnow().isoformat(),
+        "interactions": interactions
+    }
+    tmp_path = f"{path}.tmp"
+    with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+        json.dump(cassette, f, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+
+def _interaction(method, url, params, status_code, headers, body, elapsed):
+    """Builds a single cassette entry"""
+    return {
+        "request": {
+            "method": method.upper(),
+            "path": urlsplit(url).path,
+            "params": {str(k): str(v) for k, v in (params or {}).items()}
+        },
+        "response": {
+            "status_code": status_code,
+            "headers": dict(headers),
+            "body": body,
+            "elapsed": elapsed
+        }
+    }
+
+
+class RecordingTransport:
+    """Performs real requests and records every exchange to a cassette
+
+    Interactions are kept in memory and written out by ``save()``, which
+    runs on ``close()`` and at interpreter exit.
+    """
+
+    def __init__(self, path, transport=requests):
+        self.path = path
+        self.transport = transport
+        self.lock = threading.Lock()
+        self.interactions = load_cassette(path) if os.path.exists(path) else []
+        self.saved = len(self.interactions)
+        atexit.register(self.save)
+
+    def save(self):
+        """Writes the cassette if anything was recorded since the last save"""
+        with self.lock:
+            if self.saved == len(self.interactions):
+                return
+            interactions = list(self.interactions)
+        save_cassette(self.path, interactions)
+        with self.lock:
+            self.saved = max(self.saved, len(interactions))
+
+    def close(self):
+        self.save()
+        atexit.unregister(self.save)
+
+    def request(self, method, url, params=None, **kwargs):
+        response = self.transport.request(method, url, params=params, **kwargs)
+        entry = _interaction(
+            method, url, params,
+            response.status_code,
+            {k: v for k, v in response.headers.items() if k.lower() != 'set-cookie'},
+            response.text,
+            response.elapsed.total_seconds()
+        )
+        with self.lock:
+            self.interactions.append(entry)
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+
+class ReplayTransport:
+    """Serves recorded responses from a cassette instead of the network
+
+    Interactions sharing a key are returned in recorded order and wrap
+    around once exhausted. ``latency_scale`` multiplies the recorded
+    response time (0 disables the delay, 1 replays it unchanged).
+    """
+
+    def __init__(self, path, latency_scale=0.0):
+        self.path = path
+        self.latency_scale = latency_scale
+        self.lock = threading.Lock()
+        self.recordings = {}
+        self.cursors = {}
+        for entry in load_cassette(path):
+            req = entry['request']
+            key = _request_key(req['method'], req['path'], req.get('params'))
+            self.recordings.setdefault(key, []).append(entry['response'])
+
+    def request(self, method, url, params=None, **kwargs):
+        key = _request_key(method, url, params)
+        with self.lock:
+            responses = self.recordings.get(key)
+            if not responses:
+                raise CassetteMiss(f"No recorded interaction for {method.upper()} {url}")
+            cursor = self.cursors.get(key, 0)
+            self.cursors[key] = (cursor + 1) % len(responses)
+        recorded = responses[cursor]
+
+        if self.latency_scale > 0:
+            time.sleep(recorded.get('elapsed', 0) * self.latency_scale)
+
+        response = requests.Response()
+        response.status_code = recorded['status_code']
+        response.headers = CaseInsensitiveDict(recorded.get('headers', {}))
+        response._content = recorded.get('body', '').encode('utf-8')
+        response.encoding = 'utf-8'
+        response.url = url
+        response.elapsed = timedelta(seconds=recorded.get('elapsed', 0))
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+
+DEFAULT_DEVICE_TEMPLATE = {
+    "hostname": "sw-{n}",
+    "managementIpAddress": "10.{a}.{b}.{c}",
+    "platformId": "C9300-24U",
+    "softwareVersion": "17.3.4",
+    "reachabilityStatus": "Reachable",
+    "family": "Switches and Hubs",
+    "role": "ACCESS",
+    "serialNumber": "FCW{n:07d}"
+}
+
+# Fields that must differ between synthetic devices for IP and hostname lookups to work
+IDENTITY_FIELDS = ('hostname', 'managementIpAddress', 'serialNumber')
+
+DEFAULT_INTERFACE_TEMPLATE = {
+    "portName": "GigabitEthernet1/0/{p}",
+    "status": "up",
+    "adminStatus": "UP",
+    "vlanId": "{vlan}",
+    "speed": "1000000",
+    "duplex": "FullDuplex",
+    "interfaceType": "Physical"
+}
+
+
+def templates_from_cassette(path):
+    """Returns the first recorded device and interface to use as templates"""
+    device_template = None
+    interface_template = None
+    for entry in load_cassette(path):
+        path_ = entry['request']['path']
+        try:
+            items = json.loads(entry['response']['body']).get('response', [])
+        except (ValueError, AttributeError):
+            continue
+        if not items:
+            continue
+        if path_.endswith('/network-device') and device_template is None:
+            device_template = items[0]
+        elif path_.endswith('/interface') and interface_template is None:
+            interface_template = items[0]
+    return device_template, interface_template
+
+
+def _render(template, **values):
+    """Fills ``{placeholders}`` in the string fields of a template"""
+    rendered = {}
+    for field, value in template.items():
+        if isinstance(value, str) and '{' in value:
+            try:
+                value = value.format(**values)
+            except (KeyError, IndexError, ValueError):
+                pass
+        rendered[field] = value
+    return rendered
+
+
+def synthesize_cassette(path, device_count=1000, interfaces_per_device=24,
+                        device_template=None, interface_template=None,
+                        elapsed=0.05):
+    """Generates a cassette describing a large synthetic inventory
+
+    Templates may contain ``{n}``, ``{a}``, ``{b}``, ``{c}`` (device number
+    and IP octets), ``{p}`` (port number) and ``{vlan}`` placeholders.
+    Recorded devices can be reused as templates via ``templates_from_cassette``;
+    identity fields without placeholders, as in any recorded device, are
+    replaced with synthesized values so every device stays unique, and a
+    literal ``portName`` gets its trailing number replaced by ``{p}``.
+    """
+    device_template = dict(device_template or DEFAULT_DEVICE_TEMPLATE)
+    for field in IDENTITY_FIELDS:
+        value = device_template.get(field)
+        if isinstance(value, str) and '{' in value:
+            continue
+        if field == 'hostname' and value:
+            device_template[field] = value.replace('}', '}}') + '-{n}'
+        else:
+            device_template[field] = DEFAULT_DEVICE_TEMPLATE[field]
+    interface_template = dict(interface_template or DEFAULT_INTERFACE_TEMPLATE)
+    port_name = interface_template.get('portName')
+    if not (isinstance(port_name, str) and '{' in port_name):
+        if port_name:
+            port_name = port_name.replace('}', '}}')
+            port_name = re.sub(r'\d+$', '{p}', port_name) if re.search(r'\d$', port_name) else f"{port_name}-{{p}}"
+            interface_template['portName'] = port_name
+        else:
+            interface_template['portName'] = DEFAULT_INTERFACE_TEMPLATE['portName']
+    base_url = "https://dnac"
+
+    devices = []
+    interactions = [
+        _interaction('POST', f"{base_url}/dna/system/api/v1/auth/token", None, 200,
+                     {"Content-Type": "application/json"},
+                     json.dumps({"Token": "replay-token"}), elapsed)
+    ]
+    for n in range(device_count):
+        device = _render(device_template, n=n, a=(n >> 16) & 255,
+                         b=(n >> 8) & 255, c=n & 255)
+        device['id'] = f"synthetic-{n:08d}"
+        devices.append(device)
+
+        interfaces = []
+        for p in range(1, interfaces_per_device + 1):
+            interface = _render(interface_template, p=p, vlan=1 + p % 10, n=n)
+            interface['id'] = f"{device['id']}-{p:04d}"
+            interface['deviceId'] = device['id']
+            interfaces.append(interface)
+        interactions.append(
+            _interaction('GET', f"{base_url}/api/v1/interface", {"deviceId": device['id']},
+                         200, {"Content-Type": "application/json"},
+                         json.dumps({"response": interfaces}), elapsed)
+        )
+
+    interactions.insert(1, _interaction(
+        'GET', f"{base_url}/api/v1/network-device", None, 200,
+        {"Content-Type": "application/json"},
+        json.dumps({"response": devices}), elapsed
+    ))
+    save_cassette(path, interactions)
+    return len(devices)
@@ -0,0 +1,225 @@
+"""
+Rate-limit-aware scheduling of DNA Center API calls.
+
+Every request made through a ScheduledTransport first obtains a token
+from the bucket for its controller and endpoint. When tokens run short,
+waiting requests are served by priority (interactive before background
+before bulk) and, within a priority, the owner that has been served least
+goes first so one bulk job cannot monopolise the budget. A request that
+cannot start before its deadline fails with DeadlineExceeded instead of
+queueing forever.
+
+Rate-limit response headers (X-RateLimit-Limit/Remaining/Reset and
+Retry-After on 429, in seconds or as an HTTP date) adjust the buckets to what the controller reports.
+
+    DNAC_RATE_LIMIT=100            # requests per minute per endpoint
+    DNAC_RATE_BURST=10             # bucket capacity
+    DNAC_INTERACTIVE_DEADLINE=10   # seconds an interactive call may wait
+    DNAC_BACKGROUND_DEADLINE=300   # seconds a background call may wait
+"""
+
+import itertools
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+
+INTERACTIVE = 0
+BACKGROUND = 1
+BULK = 2
+
+# Attempts per request when the controller answers 429 Too Many Requests
+MAX_ATTEMPTS = 3
+
+
+class DeadlineExceeded(requests.RequestException):
+    """Raised when a request could not be scheduled before its deadline"""
+
+
+class TokenBucket:
+    """Classic token bucket refilled continuously at ``rate`` tokens/second"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now):
+        """Seconds until a token is available (0 when one is available now)"""
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        self.refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+def _endpoint(url):
+    """Groups URLs by controller and path; query parameters such as
+    ``?deviceId=`` are ignored, ids embedded in the path are not"""
+    parts = urlsplit(url)
+    return parts.netloc, parts.path.rstrip('/')
+
+
+def _retry_after(value, default):
+    """Returns the delay in seconds given by a Retry-After header
+
+    The header holds either a number of seconds or an HTTP date.
+    """
+    if value is None:
+        return default
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return default
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+class RequestScheduler:
+    """Hands out request permits across priorities and owners"""
+
+    def __init__(self, rate_per_minute=100, burst=10):
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self.condition = threading.Condition()
+        self.buckets = {}
+        self.waiting = []
+        self.served = {}
+        self.sequence = itertools.count()
+
+    def _bucket(self, key):
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = TokenBucket(self.rate, self.burst)
+        return bucket
+
+    def _is_next(self, ticket):
+        """True when no more urgent request waits for the same bucket"""
+        key = ticket[3]
+        rank = ticket[:3]
+        return all(other[:3] >= rank for other in self.waiting if other[3] == key)
+
+    def acquire(self, url, priority=INTERACTIVE, owner=None, deadline=None):
+        """Blocks until the request may be sent or raises DeadlineExceeded"""
+        key = _endpoint(url)
+        with self.condition:
+            ticket = (priority, self.served.get(owner, 0), next(self.sequence), key)
+            self.waiting.append(ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    bucket = self._bucket(key)
+                    wait = bucket.wait_time(now)
+                    if wait == 0 and self._is_next(ticket):
+                        bucket.tokens -= 1
+                        self.served[owner] = self.served.get(owner, 0) + 1
+                        return
+                    if deadline is not None and now + wait > deadline:
+                        raise DeadlineExceeded(
+                            f"Request to {key[1]} dropped: rate limit budget exhausted"
+                        )
+                    timeout = wait if wait > 0 else None
+                    if deadline is not None:
+                        timeout = deadline - now if timeout is None else min(timeout, deadline - now)
+                    self.condition.wait(timeout)
+            finally:
+                self.waiting.remove(ticket)
+                self.condition.notify_all()
+
+    def update(self, url, response):
+        """Adjusts the endpoint's bucket from the response rate-limit headers"""
+        headers = response.headers
+        key = _endpoint(url)
+        with self.condition:
+            bucket = self._bucket(key)
+            now = time.monotonic()
+            try:
+                if response.status_code == 429:
+                    retry_after = _retry_after(headers.get('Retry-After'), 1 / bucket.rate)
+                    bucket.blocked_until = max(bucket.blocked_until, now + retry_after)
+                    bucket.tokens = 0
+                if 'X-RateLimit-Limit' in headers:
+                    limit = float(headers['X-RateLimit-Limit'])
+                    window = float(headers.get('X-RateLimit-Window', 60))
+                    bucket.rate = max(limit / window, 1e-3)
+                if 'X-RateLimit-Remaining' in headers:
+                    remaining = float(headers['X-RateLimit-Remaining'])
+                    bucket.refill(now)
+                    bucket.tokens = min(bucket.tokens, remaining)
+                    if remaining <= 0 and 'X-RateLimit-Reset' in headers:
+                        reset = float(headers['X-RateLimit-Reset'])
+                        # Either seconds until reset or an epoch timestamp
+                        delay = reset - time.time() if reset > 1e9 else reset
+                        bucket.blocked_until = max(bucket.blocked_until, now + max(delay, 0))
+            except (TypeError, ValueError):
+                pass
+            self.condition.notify_all()
+
+
+class ScheduledTransport:
+    """Wraps a transport so every request passes through the scheduler"""
+
+    def __init__(self, transport, scheduler, priority=INTERACTIVE, owner=None, max_wait=None):
+        self.transport = transport
+        self.scheduler = scheduler
+        self.priority = priority
+        self.owner = owner
+        self.max_wait = max_wait
+
+    def request(self, method, url, **kwargs):
+        deadline = time.monotonic() + self.max_wait if self.max_wait is not None else None
+        for attempt in range(MAX_ATTEMPTS):
+            self.scheduler.acquire(url, self.priority, self.owner, deadline)
+            response = self.transport.request(method, url, **kwargs)
+            self.scheduler.update(url, response)
+            if response.status_code != 429:
+                break
+            # The bucket is now blocked until Retry-After, so the next
+            # acquire waits for it or gives up at the deadline
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """Returns the process-wide scheduler configured from the environment"""
+    global _scheduler
+
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = RequestScheduler(
+                rate_per_minute=float(os.environ.get('DNAC_RATE_LIMIT', '100')),
+                burst=float(os.environ.get('DNAC_RATE_BURST', '10'))
+            )
+        return _scheduler
+
+
+def default_max_wait(priority):
+    """Returns how long a request of this priority may wait to be sent"""
+    if priority == INTERACTIVE:
+        return float(os.environ.get('DNAC_INTERACTIVE_DEADLINE', '10'))
+    return float(os.environ.get('DNAC_BACKGROUND_DEADLINE', '300'))
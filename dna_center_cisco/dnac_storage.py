@@ -0,0 +1,26 @@
+"""
+Gzip-compressed JSON files used for snapshots, reports and profiles.
+
+Files are written to a temporary name and moved into place, so readers
+never see a partially written file.
+"""
+
+import gzip
+import json
+import os
+
+# Errors raised when a stored file is missing, truncated or not valid JSON
+READ_ERRORS = (OSError, EOFError, ValueError)
+
+
+def write_json(path, data):
+    """Atomically writes ``data`` as gzip-compressed JSON"""
+    tmp_path = f"{path}.tmp"
+    with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+        json.dump(data, f, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+
+def read_json(path):
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        return json.load(f)
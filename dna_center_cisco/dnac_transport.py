@@ -0,0 +1,85 @@
+"""
+Selects the HTTP transport used by DNAC_Manager.
+
+By default requests go straight to DNA Center through a shared session
+that keeps up to DNAC_POOL_SIZE (default 10) connections alive, or more
+when a bulk fetch runs with more workers than that. Setting
+DNAC_REPLAY_MODE switches to cassette recording or replaying (see
+dnac_replay):
+
+    DNAC_REPLAY_MODE=record|replay
+    DNAC_CASSETTE=/path/to/cassette.json.gz
+    DNAC_REPLAY_LATENCY_SCALE=1.0   # replay only, 0 disables delays
+
+Requests are paced by the shared rate-limit scheduler (see dnac_scheduler)
+unless DNAC_RATE_LIMIT=0. Replayed requests never reach the controller, so
+they are not scheduled unless DNAC_REPLAY_SCHEDULE=1 asks for it, for
+example to benchmark the scheduler itself.
+"""
+
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .dnac_replay import RecordingTransport, ReplayTransport
+from .dnac_scheduler import INTERACTIVE, ScheduledTransport, default_max_wait, get_scheduler
+
+_lock = threading.RLock()
+_session = None
+_pool_size = 0
+_replay_transport = None
+
+
+def pooled_session(min_size=0):
+    """Returns the process-wide session with a sized connection pool
+
+    The pool holds DNAC_POOL_SIZE connections, grown to ``min_size`` when a
+    caller runs more concurrent requests than that.
+    """
+    global _session, _pool_size
+
+    with _lock:
+        pool_size = max(int(os.environ.get('DNAC_POOL_SIZE', '10')), min_size)
+        if _session is None:
+            _session = requests.Session()
+        if pool_size > _pool_size:
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            _session.mount('https://', adapter)
+            _session.mount('http://', adapter)
+            _pool_size = pool_size
+        return _session
+
+
+def _base_transport():
+    global _replay_transport
+
+    mode = os.environ.get('DNAC_REPLAY_MODE', '').lower()
+    if mode not in ('record', 'replay'):
+        return pooled_session()
+
+    with _lock:
+        if _replay_transport is None:
+            cassette = os.environ.get('DNAC_CASSETTE', 'dnac_cassette.json.gz')
+            if mode == 'record':
+                _replay_transport = RecordingTransport(cassette, transport=pooled_session())
+            else:
+                latency_scale = float(os.environ.get('DNAC_REPLAY_LATENCY_SCALE', '0'))
+                _replay_transport = ReplayTransport(cassette, latency_scale=latency_scale)
+        return _replay_transport
+
+
+def get_transport(priority=INTERACTIVE, owner=None):
+    """Returns the transport configured through environment variables
+
+    ``priority`` and ``owner`` decide how the request competes for the
+    API budget (see dnac_scheduler).
+    """
+    transport = _base_transport()
+    if float(os.environ.get('DNAC_RATE_LIMIT', '100')) <= 0:
+        return transport
+    if isinstance(transport, ReplayTransport) and os.environ.get('DNAC_REPLAY_SCHEDULE') != '1':
+        return transport
+    return ScheduledTransport(transport, get_scheduler(), priority, owner,
+                              max_wait=default_max_wait(priority))
@@ -0,0 +1,304 @@
+"""
+Command-line access to Cisco DNA Center through DNAC_Manager.
+
+    python manage.py dnac devices [--format table|jsonl|csv]
+    python manage.py dnac interfaces --ip 10.10.20.81 10.10.20.82
+    python manage.py dnac interfaces --all --workers 16 --format jsonl -o interfaces.jsonl
+    python manage.py dnac logs --limit 100 --action get_network_devices
+    python manage.py dnac snapshot
+    python manage.py dnac diff [--old ID] [--new ID] [--format table|jsonl|csv]
+    python manage.py dnac baseline baseline.json [--snapshot ID]
+    python manage.py dnac dashboard [--rebuild]
+
+``snapshot``, ``diff`` and ``baseline`` drive the compliance engine (see
+dnac_compliance) and are meant to be run from cron. ``dashboard --rebuild``
+recomputes the dashboard summary from its per-device contributions.
+"""
+
+import csv
+import json
+import sys
+from contextlib import redirect_stdout
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from dna_center_cisco import dnac_compliance, dnac_dashboard, views
+from dna_center_cisco.dnac_bulk import DEFAULT_WORKERS, fetch_interfaces
+from dna_center_cisco.dnac_scheduler import BACKGROUND, BULK
+from dna_center_cisco.dnac_storage import READ_ERRORS
+
+DEVICE_COLUMNS = ['hostname', 'managementIpAddress', 'platformId',
+                  'softwareVersion', 'reachabilityStatus', 'id']
+INTERFACE_COLUMNS = ['deviceIp', 'hostname', 'portName', 'status', 'adminStatus',
+                     'vlanId', 'speed', 'duplex', 'description']
+LOG_COLUMNS = ['timestamp', 'action', 'result', 'details', 'ip_address']
+DASHBOARD_COLUMNS = ['group', 'name', 'count']
+
+
+def _change_value(value):
+    if value is None:
+        return '-'
+    if isinstance(value, dict):
+        return json.dumps(value, sort_keys=True)
+    return value
+
+
+class RowWriter:
+    """Streams rows to the output as JSON lines or CSV"""
+
+    def __init__(self, stream, fmt, columns):
+        self.stream = stream
+        self.fmt = fmt
+        self.csv = None
+        if fmt == 'csv':
+            self.csv = csv.DictWriter(stream, fieldnames=columns, extrasaction='ignore')
+            self.csv.writeheader()
+
+    def write(self, row):
+        if self.csv is not None:
+            self.csv.writerow(row)
+        else:
+            self.stream.write(json.dumps(row, default=str) + '\n')
+        self.stream.flush()
+
+
+class Command(BaseCommand):
+    help = 'Query Cisco DNA Center devices, interfaces, logs, compliance and dashboard data from the command line'
+
+    def add_arguments(self, parser):
+        subparsers = parser.add_subparsers(dest='subcommand', required=True)
+
+        for name, help_text in (('devices', 'List network devices'),
+                                ('interfaces', 'List interfaces of one or more devices'),
+                                ('logs', 'Show MongoDB operation logs'),
+                                ('snapshot', 'Save a compliance snapshot of the whole inventory'),
+                                ('diff', 'Compare two compliance snapshots'),
+                                ('baseline', 'Check a compliance snapshot against a baseline'),
+                                ('dashboard', 'Show the dashboard summary')):
+            sub = subparsers.add_parser(name, help=help_text)
+            sub.add_argument('--format', choices=['table', 'jsonl', 'csv'], default='table')
+            sub.add_argument('-o', '--output', help='Write to a file instead of stdout')
+
+            if name in ('interfaces', 'snapshot'):
+                sub.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                                 help='Concurrent interface requests')
+                sub.add_argument('--no-progress', action='store_true',
+                                 help='Do not show progress on stderr')
+            if name == 'interfaces':
+                target = sub.add_mutually_exclusive_group(required=True)
+                target.add_argument('--ip', nargs='+', help='Management IP addresses')
+                target.add_argument('--all', action='store_true', help='Every device in the inventory')
+            elif name == 'diff':
+                sub.add_argument('--old', help='Older snapshot id (default: second newest)')
+                sub.add_argument('--new', help='Newer snapshot id (default: newest)')
+            elif name == 'baseline':
+                sub.add_argument('baseline', help='Baseline JSON file')
+                sub.add_argument('--snapshot', help='Snapshot id (default: newest)')
+            elif name == 'dashboard':
+                sub.add_argument('--rebuild', action='store_true',
+                                 help='Recompute the summary from the per-device contributions first')
+            elif name == 'logs':
+                sub.add_argument('--limit', type=int, default=50)
+                sub.add_argument('--action', help='Only show logs for this action')
+
+    def handle(self, *args, **options):
+        stream = open(options['output'], 'w', newline='', encoding='utf-8') if options['output'] else sys.stdout
+        try:
+            getattr(self, f"handle_{options['subcommand']}")(stream, options)
+        finally:
+            if stream is not sys.stdout:
+                stream.close()
+
+    def _authenticate(self, priority=BULK, owner='cli'):
+        dnac = views.DNAC_Manager(priority=priority, owner=owner)
+        if not dnac.get_auth_token():
+            raise CommandError('Authentication failed')
+        return dnac
+
+    def _progress(self, options):
+        if options['no_progress'] or not sys.stderr.isatty():
+            return None
+
+        def progress(completed, total):
+            sys.stderr.write(f"\r Fetching interfaces: {completed}/{total} devices")
+            if completed == total:
+                sys.stderr.write('\n')
+            sys.stderr.flush()
+        return progress
+
+    def handle_devices(self, stream, options):
+        dnac = self._authenticate()
+        devices = dnac.get_network_devices()
+        if devices is None:
+            raise CommandError('Failed to retrieve devices')
+
+        if options['format'] == 'table':
+            with redirect_stdout(stream):
+                dnac.display_devices(devices)
+            return
+        writer = RowWriter(stream, options['format'], DEVICE_COLUMNS)
+        for device in devices:
+            writer.write(device)
+
+    def handle_interfaces(self, stream, options):
+        dnac = self._authenticate()
+        devices = dnac.get_network_devices()
+        if devices is None:
+            raise CommandError('Failed to retrieve devices')
+
+        if not options['all']:
+            by_ip = {d.get('managementIpAddress'): d for d in devices}
+            missing = [ip for ip in options['ip'] if ip not in by_ip]
+            for ip in missing:
+                self.stderr.write(f" ❌  Device {ip} not found!")
+            devices = [by_ip[ip] for ip in options['ip'] if ip in by_ip]
+
+        progress = self._progress(options)
+        writer = None if options['format'] == 'table' else RowWriter(stream, options['format'], INTERFACE_COLUMNS)
+        failures = 0
+        for device, interfaces, error in fetch_interfaces(dnac, devices, options['workers'], progress):
+            device_ip = device.get('managementIpAddress')
+            if error is not None:
+                failures += 1
+                self.stderr.write(f"\n ❌  Failed to get interfaces for {device_ip}: {error}")
+                continue
+            if writer is None:
+                with redirect_stdout(stream):
+                    print(f"\n{device.get('hostname', 'N/A')} ({device_ip})")
+                    dnac.display_interfaces(interfaces)
+                stream.flush()
+                continue
+            for intf in interfaces:
+                writer.write(dict(intf, deviceIp=device_ip, hostname=device.get('hostname')))
+
+        # Log to MongoDB
+        log_entry = {
+            "timestamp": datetime.utcnow(),
+            "action": "bulk_get_device_interfaces",
+            "result": "failure" if failures else "success",
+            "details": f"Interfaces retrieved for {len(devices) - failures}/{len(devices)} devices"
+        }
+        views.log_action(log_entry)
+
+        if failures:
+            raise CommandError(f"Failed to get interfaces for {failures} devices")
+
+    def handle_logs(self, stream, options):
+        if views.logs_read_collection is None:
+            raise CommandError('MongoDB is not available')
+
+        query = {'action': options['action']} if options['action'] else {}
+        cursor = views.logs_read_collection.find(query, {'_id': 0}).sort("timestamp", -1).limit(options['limit'])
+
+        if options['format'] == 'table':
+            stream.write(f"{'Timestamp':28}{'Action':28}{'Result':10}{'IP Address':16}Details\n")
+            stream.write("-" * 100 + "\n")
+            for log in cursor:
+                stream.write(
+                    f"{str(log.get('timestamp', 'N/A')):28}"
+                    f"{log.get('action', 'N/A'):28}"
+                    f"{log.get('result', 'N/A'):10}"
+                    f"{log.get('ip_address') or 'N/A':16}"
+                    f"{log.get('details', '')}\n"
+                )
+            return
+        writer = RowWriter(stream, options['format'], LOG_COLUMNS)
+        for log in cursor:
+            writer.write(log)
+
+    def handle_snapshot(self, stream, options):
+        dnac = self._authenticate(priority=BACKGROUND, owner='compliance')
+        snapshot = dnac_compliance.take_snapshot(dnac, options['workers'], self._progress(options))
+        if snapshot is None:
+            raise CommandError('Failed to retrieve devices')
+        dnac_compliance.save_snapshot(snapshot)
+
+        for device_id, info in sorted(snapshot['failed'].items()):
+            self.stderr.write(f" ❌  Failed to get interfaces for {info['ip_address']}: {info['error']}")
+        stream.write(
+            f"Snapshot {snapshot['id']} saved with {len(snapshot['devices'])} devices"
+            f" ({len(snapshot['failed'])} failed)\n"
+        )
+
+        # Log to MongoDB
+        log_entry = {
+            "timestamp": datetime.utcnow(),
+            "action": "compliance_snapshot",
+            "result": "failure" if snapshot['failed'] else "success",
+            "details": f"Snapshot {snapshot['id']}: {len(snapshot['devices'])} devices, {len(snapshot['failed'])} failed"
+        }
+        views.log_action(log_entry)
+
+    def _load_snapshot(self, snapshot_id, position):
+        if not snapshot_id:
+            snapshots = dnac_compliance.list_snapshots()
+            if len(snapshots) <= position:
+                raise CommandError('Not enough snapshots taken yet')
+            snapshot_id = snapshots[position]
+        try:
+            return dnac_compliance.load_snapshot(snapshot_id)
+        except READ_ERRORS as e:
+            raise CommandError(f"Failed to load snapshot {snapshot_id}: {e}")
+
+    def _write_report(self, stream, report, fmt):
+        dnac_compliance.save_report(report)
+        if fmt == 'jsonl':
+            stream.write(json.dumps(report, default=str) + '\n')
+            return
+        if fmt == 'csv':
+            stream.write(dnac_compliance.report_to_csv(report))
+            return
+
+        summary = report['summary']
+        stream.write(
+            f"Report {report['id']}: {summary['devices_checked']} devices checked, "
+            f"{summary['devices_changed']} changed, {summary['devices_skipped']} skipped, "
+            f"{summary['changes']} changes\n"
+        )
+        for device in report['devices']:
+            stream.write(f"\n{device['hostname'] or device['id']} ({device['ip_address'] or 'N/A'})\n")
+            for change in device['changes']:
+                stream.write(
+                    f"  {change['port'] or '-':30}{change['kind']:22}"
+                    f"{_change_value(change['old'])} -> {_change_value(change['new'])}\n"
+                )
+
+    def handle_diff(self, stream, options):
+        old = self._load_snapshot(options['old'], 1)
+        new = self._load_snapshot(options['new'], 0)
+        self._write_report(stream, dnac_compliance.diff_snapshots(old, new), options['format'])
+
+    def handle_baseline(self, stream, options):
+        snapshot = self._load_snapshot(options['snapshot'], 0)
+        try:
+            with open(options['baseline'], encoding='utf-8') as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Failed to read baseline: {e}")
+        self._write_report(stream, dnac_compliance.check_baseline(snapshot, baseline), options['format'])
+
+    def handle_dashboard(self, stream, options):
+        if dnac_dashboard.dashboard_collection is None:
+            raise CommandError('MongoDB is not available')
+
+        summary = dnac_dashboard.rebuild_summary() if options['rebuild'] else dnac_dashboard.get_summary()
+        if summary is None:
+            raise CommandError('No dashboard data recorded yet')
+
+        rows = [{'group': 'devices', 'name': 'total', 'count': summary['devices']}]
+        for group in ('reachability', 'platforms', 'versions'):
+            rows.extend({'group': group, 'name': name, 'count': count} for name, count in summary[group])
+        for vlan in summary['vlans']:
+            rows.append({'group': 'vlan_up', 'name': vlan['vlan'], 'count': vlan['up']})
+            rows.append({'group': 'vlan_down', 'name': vlan['vlan'], 'count': vlan['down']})
+
+        if options['format'] == 'table':
+            stream.write(f"{'Group':15}{'Name':30}Count\n")
+            stream.write("-" * 55 + "\n")
+            for row in rows:
+                stream.write(f"{row['group']:15}{row['name']:30}{row['count']}\n")
+            return
+        writer = RowWriter(stream, options['format'], DASHBOARD_COLUMNS)
+        for row in rows:
+            writer.write(row)
@@ -1,3 +1,561 @@
-from django.test import TestCase
+import json
+import io
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from contextlib import redirect_stdout
+from email.utils import formatdate
+from unittest import mock
 
-# Create your tests here.
\ No newline at end of file
+import requests
+from django.core.exceptions import ImproperlyConfigured, MiddlewareNotUsed
+from django.core.management import call_command
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase
+from pymongo import ReadPreference
+from pymongo.errors import AutoReconnect
+
+try:
+    import mongomock
+except ImportError:
+    mongomock = None
+
+
+from dna_center_cisco import (dnac_compliance, dnac_dashboard, dnac_mongo, dnac_profiling, dnac_transport,
+                              views)
+from dna_center_cisco.dnac_bulk import QUEUE_FACTOR, fetch_interfaces
+from dna_center_cisco.dnac_scheduler import (BULK, INTERACTIVE, DeadlineExceeded, RequestScheduler,
+                                             ScheduledTransport)
+from dna_center_cisco.dnac_replay import (RecordingTransport, ReplayTransport, load_cassette,
+                                          synthesize_cassette, templates_from_cassette)
+
+
+class ReplayTestCase(SimpleTestCase):
+    """Runs DNAC_Manager against a synthesized cassette with MongoDB disabled"""
+
+    device_count = 5
+    interfaces_per_device = 3
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.cassette = os.path.join(self.tmpdir, 'cassette.json.gz')
+        synthesize_cassette(self.cassette, self.device_count, self.interfaces_per_device)
+
+        for target in ('dna_center_cisco.views.logs_collection',
+                       'dna_center_cisco.dnac_dashboard.dashboard_collection'):
+            patcher = mock.patch(target, None)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def manager(self, cassette=None):
+        dnac = views.DNAC_Manager(transport=ReplayTransport(cassette or self.cassette))
+        self.assertTrue(dnac.get_auth_token())
+        return dnac
+
+
+class ReplayTransportTests(ReplayTestCase):
+
+    def test_replays_inventory(self):
+        devices = self.manager().get_network_devices()
+        self.assertEqual(len(devices), self.device_count)
+
+    def test_interfaces_of_any_device_by_ip(self):
+        dnac = self.manager()
+        devices = dnac.get_network_devices()
+        interfaces = dnac.get_device_interfaces(devices[-1]['managementIpAddress'])
+        self.assertEqual(len(interfaces), self.interfaces_per_device)
+        self.assertTrue(all(i['deviceId'] == devices[-1]['id'] for i in interfaces))
+
+    def test_templates_from_recording_give_unique_devices(self):
+        device, interface = templates_from_cassette(self.cassette)
+        derived = os.path.join(self.tmpdir, 'derived.json.gz')
+        synthesize_cassette(derived, 5, 2, device_template=device, interface_template=interface)
+
+        dnac = self.manager(derived)
+        devices = dnac.get_network_devices()
+        for field in ('hostname', 'managementIpAddress', 'serialNumber'):
+            self.assertEqual(len({d[field] for d in devices}), 5, field)
+        ports = [i['portName'] for i in dnac.get_interfaces_by_device_id(devices[0]['id'])]
+        self.assertEqual(ports, ['GigabitEthernet1/0/1', 'GigabitEthernet1/0/2'])
+
+    def test_recording_is_saved_on_close(self):
+        recorded = os.path.join(self.tmpdir, 'recorded.json.gz')
+        recorder = RecordingTransport(recorded, transport=ReplayTransport(self.cassette))
+        dnac = views.DNAC_Manager(transport=recorder)
+        self.assertTrue(dnac.get_auth_token())
+        dnac.get_network_devices()
+        self.assertFalse(os.path.exists(recorded))
+
+        recorder.close()
+        self.assertEqual(len(load_cassette(recorded)), 2)
+        self.assertEqual(len(self.manager(recorded).get_network_devices()), self.device_count)
+
+
+class BulkFetchTests(ReplayTestCase):
+
+    device_count = 20
+
+    def test_fetches_every_device(self):
+        dnac = self.manager()
+        devices = dnac.get_network_devices()
+        results = list(fetch_interfaces(dnac, devices, workers=4))
+        self.assertEqual(sorted(d['id'] for d, _, _ in results), sorted(d['id'] for d in devices))
+        self.assertTrue(all(error is None for _, _, error in results))
+
+    def test_stopping_early_leaves_remaining_devices_unrequested(self):
+        dnac = self.manager()
+        devices = dnac.get_network_devices()
+        fetch = dnac.get_interfaces_by_device_id
+        lock = threading.Lock()
+        requested = []
+
+        def get_interfaces(device_id):
+            with lock:
+                requested.append(device_id)
+            return fetch(device_id)
+
+        with mock.patch.object(dnac, 'get_interfaces_by_device_id', side_effect=get_interfaces):
+            results = fetch_interfaces(dnac, devices, workers=2)
+            next(results)
+            results.close()
+        self.assertLessEqual(len(requested), 2 * 2 * QUEUE_FACTOR)
+
+    def test_pool_grows_to_worker_count(self):
+        with mock.patch.object(dnac_transport, '_session', None), \
+                mock.patch.object(dnac_transport, '_pool_size', 0):
+            session = dnac_transport.pooled_session()
+            self.assertEqual(session.get_adapter('https://dnac')._pool_maxsize, 10)
+            self.assertIs(dnac_transport.pooled_session(min_size=32), session)
+            self.assertEqual(session.get_adapter('https://dnac')._pool_maxsize, 32)
+
+
+class DashboardRefreshTests(ReplayTestCase):
+
+    def test_interface_lookup_does_not_refresh_device_aggregates(self):
+        dnac = self.manager()
+        devices = dnac.get_network_devices(record=False)
+        with mock.patch.object(dnac_dashboard, 'record_devices') as record_devices, \
+                mock.patch.object(dnac_dashboard, 'record_interfaces') as record_interfaces:
+            dnac.get_device_interfaces(devices[0]['managementIpAddress'])
+            dnac.get_network_devices()
+        record_devices.assert_called_once()
+        record_interfaces.assert_called_once()
+
+
+class DisplayTests(ReplayTestCase):
+
+    def test_tables_show_missing_values(self):
+        dnac = self.manager()
+        output = io.StringIO()
+        with redirect_stdout(output):
+            dnac.display_devices([{'hostname': None, 'managementIpAddress': '10.0.0.1'}])
+            dnac.display_interfaces([{'portName': 'Gi1/0/1', 'vlanId': None}])
+        self.assertIn('N/A', output.getvalue())
+
+
+def _response(status_code, headers=None):
+    response = requests.Response()
+    response.status_code = status_code
+    response.headers.update(headers or {})
+    return response
+
+
+class SchedulerTests(SimpleTestCase):
+
+    url = 'https://dnac/api/v1/interface'
+
+    def exhausted_scheduler(self, rate_per_minute=600):
+        scheduler = RequestScheduler(rate_per_minute=rate_per_minute, burst=1)
+        scheduler.acquire(self.url)
+        return scheduler
+
+    def wait_for_waiters(self, scheduler, count):
+        for _ in range(200):
+            with scheduler.condition:
+                if len(scheduler.waiting) >= count:
+                    return
+            time.sleep(0.005)
+        self.fail('requests did not queue')
+
+    def test_interactive_requests_go_before_bulk(self):
+        scheduler = self.exhausted_scheduler()
+        order = []
+
+        def acquire(priority):
+            scheduler.acquire(self.url, priority, owner=priority)
+            order.append(priority)
+
+        bulk = threading.Thread(target=acquire, args=(BULK,))
+        bulk.start()
+        self.wait_for_waiters(scheduler, 1)
+        interactive = threading.Thread(target=acquire, args=(INTERACTIVE,))
+        interactive.start()
+        bulk.join(5)
+        interactive.join(5)
+        self.assertEqual(order, [INTERACTIVE, BULK])
+
+    def test_request_past_deadline_is_dropped(self):
+        scheduler = self.exhausted_scheduler(rate_per_minute=1)
+        with self.assertRaises(DeadlineExceeded):
+            scheduler.acquire(self.url, deadline=time.monotonic() + 0.05)
+        self.assertEqual(scheduler.waiting, [])
+
+    def test_retry_after_accepts_seconds_and_http_dates(self):
+        for retry_after in ('30', formatdate(time.time() + 30, usegmt=True)):
+            scheduler = RequestScheduler()
+            scheduler.update(self.url, _response(429, {'Retry-After': retry_after}))
+            bucket = scheduler.buckets[('dnac', '/api/v1/interface')]
+            self.assertGreater(bucket.blocked_until - time.monotonic(), 20, retry_after)
+            self.assertEqual(bucket.tokens, 0)
+
+    def test_throttled_requests_are_retried(self):
+        transport = mock.Mock()
+        transport.request.side_effect = [_response(429, {'Retry-After': '0'}), _response(200)]
+        scheduled = ScheduledTransport(transport, RequestScheduler(rate_per_minute=6000), max_wait=5)
+        self.assertEqual(scheduled.get(self.url).status_code, 200)
+        self.assertEqual(transport.request.call_count, 2)
+
+    def test_replay_is_not_scheduled_by_default(self):
+        cassette = os.path.join(tempfile.mkdtemp(), 'cassette.json.gz')
+        self.addCleanup(shutil.rmtree, os.path.dirname(cassette))
+        synthesize_cassette(cassette, 1, 1)
+        environ = {'DNAC_REPLAY_MODE': 'replay', 'DNAC_CASSETTE': cassette}
+        with mock.patch.object(dnac_transport, '_replay_transport', None):
+            with mock.patch.dict(os.environ, environ):
+                self.assertIsInstance(dnac_transport.get_transport(), ReplayTransport)
+            with mock.patch.dict(os.environ, dict(environ, DNAC_REPLAY_SCHEDULE='1')):
+                self.assertIsInstance(dnac_transport.get_transport(), ScheduledTransport)
+
+
+class MongoSettingsTests(SimpleTestCase):
+
+    def settings(self, **environ):
+        patcher = mock.patch.dict(os.environ, environ)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        output = io.StringIO()
+        with redirect_stdout(output):
+            return dnac_mongo.log_write_concern(), dnac_mongo.log_read_preference(), output.getvalue()
+
+    def test_write_concern_accepts_numbers_and_majority(self):
+        self.assertEqual(self.settings(MONGODB_LOG_WRITE_CONCERN='0')[0].document, {'w': 0})
+        self.assertEqual(self.settings(MONGODB_LOG_WRITE_CONCERN='majority')[0].document, {'w': 'majority'})
+
+    def test_invalid_settings_fall_back_with_a_warning(self):
+        write_concern, read_preference, output = self.settings(
+            MONGODB_LOG_WRITE_CONCERN='all', MONGODB_LOG_READ_PREFERENCE='fastest'
+        )
+        self.assertEqual(write_concern.document, {'w': 1})
+        self.assertEqual(read_preference, ReadPreference.SECONDARY_PREFERRED)
+        self.assertIn('MONGODB_LOG_WRITE_CONCERN', output)
+        self.assertIn('MONGODB_LOG_READ_PREFERENCE', output)
+
+    def test_invalid_client_options_are_skipped(self):
+        self.settings(MONGODB_MAX_POOL_SIZE='abc', MONGODB_MIN_POOL_SIZE='-1',
+                      MONGODB_SERVER_SELECTION_TIMEOUT_MS='500', MONGODB_COMPRESSORS='')
+        output = io.StringIO()
+        with redirect_stdout(output):
+            options = dnac_mongo.client_options()
+        self.assertEqual(options, {'serverSelectionTimeoutMS': 500})
+        self.assertIn('MONGODB_MAX_POOL_SIZE', output.getvalue())
+        self.assertIn('MONGODB_MIN_POOL_SIZE', output.getvalue())
+
+    def test_read_preference_by_name(self):
+        self.assertEqual(self.settings(MONGODB_LOG_READ_PREFERENCE='nearest')[1], ReadPreference.NEAREST)
+
+
+@unittest.skipUnless(mongomock, 'mongomock is not installed')
+class DashboardTests(SimpleTestCase):
+
+    def setUp(self):
+        self.collection = mongomock.MongoClient().db.dashboard
+        patcher = mock.patch.object(dnac_dashboard, 'dashboard_collection', self.collection)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def device(self, n, version='17.3.4', reachability='Reachable'):
+        return {'id': f"dev-{n}", 'platformId': 'C9300-24U', 'softwareVersion': version,
+                'reachabilityStatus': reachability}
+
+    def interfaces(self, up, down, vlan='10'):
+        return [{'vlanId': vlan, 'status': 'up'}] * up + [{'vlanId': vlan, 'status': 'down'}] * down
+
+    def assertConsistent(self):
+        """The incremental summary must match one rebuilt from the contributions"""
+        summary = dnac_dashboard.get_summary()
+        rebuilt = dnac_dashboard.rebuild_summary()
+        summary.pop('updated_at')
+        rebuilt.pop('updated_at')
+        self.assertEqual(summary, rebuilt)
+        return summary
+
+    def test_added_devices_and_interfaces(self):
+        dnac_dashboard.record_devices([self.device(1), self.device(2, version='17.6.1')])
+        dnac_dashboard.record_interfaces('dev-1', self.interfaces(3, 1))
+        summary = self.assertConsistent()
+        self.assertEqual(summary['devices'], 2)
+        self.assertEqual(summary['versions'], [('17.3.4', 1), ('17.6.1', 1)])
+        self.assertEqual(summary['vlans'], [{'vlan': '10', 'up': 3, 'down': 1}])
+
+    def test_changed_device_moves_its_counts(self):
+        dnac_dashboard.record_devices([self.device(1), self.device(2)])
+        dnac_dashboard.record_devices([self.device(1), self.device(2, version='17.6.1', reachability='Unreachable')])
+        dnac_dashboard.record_interfaces('dev-1', self.interfaces(2, 0))
+        dnac_dashboard.record_interfaces('dev-1', self.interfaces(1, 1, vlan='20'))
+        summary = self.assertConsistent()
+        self.assertEqual(summary['devices'], 2)
+        self.assertEqual(summary['reachability'], [('Reachable', 1), ('Unreachable', 1)])
+        self.assertEqual(summary['vlans'], [{'vlan': '20', 'up': 1, 'down': 1}])
+        self.assertEqual(self.collection.find_one({'_id': 'device:dev-2'})['revision'], 2)
+
+    def test_removed_device_takes_its_interfaces(self):
+        dnac_dashboard.record_devices([self.device(1), self.device(2)])
+        dnac_dashboard.record_interfaces('dev-2', self.interfaces(4, 0))
+        dnac_dashboard.record_devices([self.device(1)])
+        summary = self.assertConsistent()
+        self.assertEqual(summary['devices'], 1)
+        self.assertEqual(summary['vlans'], [])
+        self.assertIsNone(self.collection.find_one({'_id': 'interfaces:dev-2'}))
+
+    def test_concurrent_change_is_not_counted_twice(self):
+        dnac_dashboard.record_interfaces('dev-1', self.interfaces(2, 0))
+        find_one = self.collection.find_one
+        raced = []
+
+        def racing_find_one(*args, **kwargs):
+            # Another worker refreshes the same device after this one read the contribution
+            stale = find_one(*args, **kwargs)
+            if not raced:
+                raced.append(True)
+                dnac_dashboard.record_interfaces('dev-1', self.interfaces(5, 0))
+            return stale
+
+        with mock.patch.object(self.collection, 'find_one', side_effect=racing_find_one):
+            dnac_dashboard.record_interfaces('dev-1', self.interfaces(0, 1))
+        summary = self.assertConsistent()
+        self.assertEqual(summary['vlans'], [{'vlan': '10', 'up': 0, 'down': 1}])
+
+    def test_failed_refresh_keeps_summary_consistent(self):
+        insert_one = self.collection.insert_one
+        calls = []
+
+        def failing_insert_one(*args, **kwargs):
+            calls.append(True)
+            if len(calls) == 3:
+                raise AutoReconnect('connection lost')
+            return insert_one(*args, **kwargs)
+
+        devices = [self.device(n) for n in range(3)]
+        with mock.patch.object(self.collection, 'insert_one', side_effect=failing_insert_one):
+            with self.assertRaises(AutoReconnect):
+                dnac_dashboard.record_devices(devices)
+        self.assertEqual(self.assertConsistent()['devices'], 2)
+
+        dnac_dashboard.record_devices(devices)
+        self.assertEqual(self.assertConsistent()['devices'], 3)
+
+    def test_rebuild_repairs_a_drifted_summary(self):
+        dnac_dashboard.record_devices([self.device(1), self.device(2)])
+        self.collection.update_one({'_id': 'summary'}, {'$inc': {'devices': 5}})
+        self.assertEqual(dnac_dashboard.rebuild_summary()['devices'], 2)
+
+    def test_dashboard_command_rebuilds(self):
+        dnac_dashboard.record_devices([self.device(1)])
+        self.collection.delete_one({'_id': 'summary'})
+        output = os.path.join(tempfile.mkdtemp(), 'dashboard.jsonl')
+        self.addCleanup(shutil.rmtree, os.path.dirname(output))
+        call_command('dnac', 'dashboard', '--rebuild', '--format', 'jsonl', '-o', output)
+        with open(output, encoding='utf-8') as f:
+            rows = [json.loads(line) for line in f]
+        self.assertIn({'group': 'devices', 'name': 'total', 'count': 1}, rows)
+
+
+class ProfilingTests(SimpleTestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.environ({})
+
+    def environ(self, values):
+        environ = {'DNAC_PROFILE_DIR': self.tmpdir, 'DNAC_PROFILE_INTERVAL_MS': '1'}
+        environ.update(values)
+        patcher = mock.patch.dict(os.environ, environ)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        for variable in ('DNAC_PROFILE_SAMPLE_PERCENT', 'DNAC_PROFILE_SLOW_MS', 'DNAC_PROFILE_KEEP'):
+            if variable not in values:
+                os.environ.pop(variable, None)
+
+    def request(self, middleware, seconds=0.0):
+        def get_response(request):
+            with dnac_profiling.span('fetch'):
+                time.sleep(seconds)
+            return HttpResponse('ok')
+
+        middleware.get_response = get_response
+        return middleware(RequestFactory().get('/devices/'))
+
+    def test_disabled_without_settings(self):
+        with self.assertRaises(MiddlewareNotUsed):
+            dnac_profiling.ProfilingMiddleware(None)
+
+    def test_keep_must_be_positive(self):
+        self.environ({'DNAC_PROFILE_SAMPLE_PERCENT': '100', 'DNAC_PROFILE_KEEP': '0'})
+        with self.assertRaises(ImproperlyConfigured):
+            dnac_profiling.ProfilingMiddleware(None)
+        with self.assertRaises(ValueError):
+            dnac_profiling.save_profile({'id': '1'}, keep=0)
+
+    def test_sampled_request_is_stored(self):
+        self.environ({'DNAC_PROFILE_SAMPLE_PERCENT': '100'})
+        self.request(dnac_profiling.ProfilingMiddleware(None), seconds=0.05)
+
+        profiles = dnac_profiling.list_profiles()
+        self.assertEqual(len(profiles), 1)
+        self.assertEqual(profiles[0]['reason'], 'sampled')
+        self.assertEqual(profiles[0]['spans']['fetch']['count'], 1)
+        record = dnac_profiling.load_profile(profiles[0]['id'])
+        self.assertGreater(record['samples'], 0)
+        self.assertTrue(any('get_response' in stack for stack in record['stacks']))
+
+    def test_only_slow_requests_are_kept(self):
+        self.environ({'DNAC_PROFILE_SLOW_MS': '30'})
+        middleware = dnac_profiling.ProfilingMiddleware(None)
+        self.request(middleware)
+        self.request(middleware, seconds=0.05)
+
+        profiles = dnac_profiling.list_profiles()
+        self.assertEqual([p['reason'] for p in profiles], ['slow'])
+        self.assertGreaterEqual(profiles[0]['duration_ms'], 30)
+
+    def test_oldest_profiles_are_pruned(self):
+        for n in range(5):
+            dnac_profiling.save_profile({'id': f"2024010{n}", 'stacks': {}}, keep=2)
+        self.assertEqual([p['id'] for p in dnac_profiling.list_profiles()], ['20240104', '20240103'])
+
+    def test_collapsed_stacks(self):
+        record = {'stacks': {'views:index;views:render': 3, 'views:index': 1}}
+        self.assertEqual(dnac_profiling.collapsed_stacks(record),
+                         'views:index 1\nviews:index;views:render 3\n')
+
+    def test_unknown_or_truncated_profile_is_not_found(self):
+        with open(os.path.join(self.tmpdir, 'profile-partial.json.gz'), 'wb') as f:
+            f.write(b'\x1f\x8b\x08\x00')
+        self.assertEqual(dnac_profiling.list_profiles(), [])
+        for profile_id in ('unknown', 'partial'):
+            response = self.client.get(f"/profiles/{profile_id}/collapsed/")
+            self.assertEqual(response.status_code, 404, profile_id)
+
+
+class ComplianceTests(ReplayTestCase):
+
+    def setUp(self):
+        super().setUp()
+        patcher = mock.patch.dict(os.environ, {'DNAC_SNAPSHOT_DIR': os.path.join(self.tmpdir, 'snapshots')})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def snapshot(self):
+        return dnac_compliance.take_snapshot(self.manager(), workers=2)
+
+    def test_diff_device_reports_interface_changes(self):
+        old = {'softwareVersion': '17.3.4', 'interfaces': {
+            'Gi1/0/1': {'vlanId': '10', 'speed': '1000000', 'adminStatus': 'UP', 'status': 'up'},
+            'Gi1/0/2': {'vlanId': '10', 'speed': '1000000', 'adminStatus': 'UP', 'status': 'up'}
+        }}
+        new = {'softwareVersion': '17.6.1', 'interfaces': {
+            'Gi1/0/1': {'vlanId': '20', 'speed': '100000', 'adminStatus': 'DOWN', 'status': 'down'},
+            'Gi1/0/3': {'vlanId': '10', 'speed': '1000000', 'adminStatus': 'UP', 'status': 'up'}
+        }}
+        kinds = [(c['port'], c['kind']) for c in dnac_compliance.diff_device(old, new)]
+        self.assertEqual(kinds, [
+            (None, 'softwareVersion_changed'),
+            ('Gi1/0/1', 'vlan_changed'),
+            ('Gi1/0/1', 'speed_changed'),
+            ('Gi1/0/1', 'admin_down'),
+            ('Gi1/0/1', 'status_changed'),
+            ('Gi1/0/2', 'interface_removed'),
+            ('Gi1/0/3', 'interface_added')
+        ])
+
+    def test_check_device_against_baseline(self):
+        record = {'interfaces': {
+            'Gi1/0/1': {'vlanId': '20', 'speed': '1000000', 'adminStatus': 'DOWN'},
+            'Gi1/0/2': {'vlanId': '10', 'speed': '100000', 'adminStatus': 'UP'}
+        }}
+        expected = {
+            'defaults': {'adminStatus': 'UP', 'speed': '1000000'},
+            'interfaces': {'Gi1/0/1': {'vlanId': '10'}, 'Gi1/0/9': {'vlanId': '10'}}
+        }
+        kinds = [(c['port'], c['kind']) for c in dnac_compliance.check_device(record, expected)]
+        self.assertEqual(kinds, [
+            ('Gi1/0/1', 'admin_down'),
+            ('Gi1/0/1', 'vlan_mismatch'),
+            ('Gi1/0/2', 'speed_mismatch'),
+            ('Gi1/0/9', 'missing_interface')
+        ])
+
+    def test_diff_only_inspects_changed_hashes(self):
+        old = self.snapshot()
+        new = self.snapshot()
+        device_id = sorted(new['devices'])[0]
+        port = sorted(new['devices'][device_id]['interfaces'])[0]
+        new['devices'][device_id]['interfaces'][port]['vlanId'] = '99'
+        new['hashes'][device_id] = dnac_compliance._hash_record(new['devices'][device_id])
+
+        with mock.patch.object(dnac_compliance, 'diff_device', wraps=dnac_compliance.diff_device) as diff_device:
+            report = dnac_compliance.diff_snapshots(old, new)
+        diff_device.assert_called_once_with(old['devices'][device_id], new['devices'][device_id])
+        self.assertEqual(report['summary']['devices_checked'], self.device_count)
+        self.assertEqual(report['summary']['devices_unchanged'], self.device_count - 1)
+        self.assertEqual([d['id'] for d in report['devices']], [device_id])
+
+    def test_failed_devices_are_skipped(self):
+        dnac = self.manager()
+        devices = dnac.get_network_devices()
+        broken = devices[0]['id']
+        fetch = dnac.get_interfaces_by_device_id
+
+        def get_interfaces(device_id):
+            if device_id == broken:
+                raise ConnectionError('unreachable')
+            return fetch(device_id)
+
+        old = self.snapshot()
+        with mock.patch.object(dnac, 'get_interfaces_by_device_id', side_effect=get_interfaces) as patched:
+            new = dnac_compliance.take_snapshot(dnac, workers=2, retries=1)
+        self.assertEqual(sum(1 for call in patched.call_args_list if call.args == (broken,)), 2)
+        self.assertEqual(list(new['failed']), [broken])
+        self.assertNotIn(broken, new['devices'])
+
+        report = dnac_compliance.diff_snapshots(old, new)
+        self.assertEqual(report['devices'], [])
+        self.assertEqual(report['summary']['devices_skipped'], 1)
+        self.assertEqual(report['skipped'][0]['id'], broken)
+
+    def test_report_to_csv(self):
+        snapshot = self.snapshot()
+        baseline = {'defaults': {'vlanId': '1'}}
+        report = dnac_compliance.check_baseline(snapshot, baseline)
+        rows = dnac_compliance.report_to_csv(report).splitlines()
+        self.assertEqual(rows[0], 'device_id,hostname,ip_address,port,kind,old,new')
+        self.assertEqual(len(rows) - 1, report['summary']['changes'])
+        self.assertTrue(all(',vlan_mismatch,1,' in row for row in rows[1:]))
+
+    def test_snapshot_and_diff_commands(self):
+        output = os.path.join(self.tmpdir, 'output')
+        with mock.patch('dna_center_cisco.views.get_transport', return_value=ReplayTransport(self.cassette)):
+            call_command('dnac', 'snapshot', '--no-progress', '-o', output)
+            call_command('dnac', 'snapshot', '--no-progress', '-o', output)
+        self.assertEqual(len(dnac_compliance.list_snapshots()), 2)
+
+        call_command('dnac', 'diff', '--format', 'jsonl', '-o', output)
+        with open(output, encoding='utf-8') as f:
+            report = json.loads(f.read())
+        self.assertEqual(report['summary']['devices_unchanged'], self.device_count)
+        self.assertEqual(dnac_compliance.list_reports(), [report['id']])
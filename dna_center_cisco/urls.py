@@ -3,8 +3,14 @@ from . import views
 
 urlpatterns = [
     path('', views.index, name='index'),
+    path('dashboard/', views.dashboard_view, name='dashboard'),
     path('authenticate/', views.authenticate_view, name='authenticate'),
     path('devices/', views.list_devices_view, name='list_devices'),
     path('interfaces/', views.device_interfaces_view, name='device_interfaces'),
     path('logs/', views.view_logs, name='view_logs'),
+    path('compliance/', views.compliance_view, name='compliance'),
+    path('compliance/report/<str:report_id>/', views.compliance_report_view, name='compliance_report'),
+    path('profiles/', views.profiles_view, name='profiles'),
+    path('profiles/<str:profile_id>/collapsed/', views.profile_collapsed_view, name='profile_collapsed'),
+    path('mongo/pool/', views.mongo_pool_view, name='mongo_pool'),
 ]
\ No newline at end of file
@@ -1,48 +1,53 @@
-import requests
 from requests.auth import HTTPBasicAuth
 from .dnac_config import DNAC
+from .dnac_transport import get_transport
+from .dnac_scheduler import INTERACTIVE, BACKGROUND
+from . import dnac_compliance
+from .dnac_profiling import span, render
+from . import dnac_profiling
+from .dnac_storage import READ_ERRORS
+from .dnac_mongo import logs_collection, logs_read_collection, pool_metrics
+from . import dnac_dashboard
 import urllib3
-import sys
-from django.shortcuts import render
-from django.http import JsonResponse
+from django.shortcuts import redirect
+from django.http import JsonResponse, HttpResponse, Http404
 from datetime import datetime
-import pymongo
-import os
+import json
 
 # Disable SSL warnings for sandbox
 urllib3.disable_warnings()
 
-# MongoDB connection
-try:
-    # Try to get MongoDB connection details from environment variables
-    mongo_host = os.environ.get('MONGODB_HOST', 'localhost')
-    mongo_port = os.environ.get('MONGODB_PORT', '27017')
-    mongo_db = os.environ.get('MONGODB_DB', 'assignment9')
-    mongo_collection = os.environ.get('MONGODB_COLLECTION', 'logs')
-    
-    # Create MongoDB client
-    client = pymongo.MongoClient(f"mongodb://{mongo_host}:{mongo_port}/")
-    db = client[mongo_db]
-    logs_collection = db[mongo_collection]
-except Exception as e:
-    print(f"Failed to connect to MongoDB: {str(e)}")
-    logs_collection = None
+def log_action(log_entry):
+    """Writes a log entry to MongoDB when it is available"""
+    if logs_collection is not None:
+        with span('log'):
+            logs_collection.insert_one(log_entry)
+
+def update_dashboard(update, *args):
+    """Applies an inventory refresh to the dashboard aggregates"""
+    try:
+        with span('dashboard'):
+            update(*args)
+    except Exception as e:
+        print(f" ⚠️  Failed to update dashboard: {str(e)}")
 
 class DNAC_Manager:
 
-    def __init__(self):
+    def __init__(self, transport=None, priority=INTERACTIVE, owner=None):
         self.token = None
+        self.transport = transport or get_transport(priority, owner)
 
     def get_auth_token(self, display_token=False):
         """Authenticates to DNA Center and stores token"""
         try:
             url = f"https://{DNAC['host']}:{DNAC['port']}/dna/system/api/v1/auth/token"
-            response = requests.post(
-                url,
-                auth=HTTPBasicAuth(DNAC['username'], DNAC['password']),
-                verify=False,
-                timeout=10
-            )
+            with span('auth'):
+                response = self.transport.post(
+                    url,
+                    auth=HTTPBasicAuth(DNAC['username'], DNAC['password']),
+                    verify=False,
+                    timeout=10
+                )
             response.raise_for_status()
             self.token = response.json()['Token']
 
@@ -53,8 +58,7 @@ class DNAC_Manager:
                 "result": "success",
                 "details": "Token obtained successfully"
             }
-            if logs_collection is not None:
-                logs_collection.insert_one(log_entry)
+            log_action(log_entry)
 
             return True
 
@@ -66,14 +70,17 @@ class DNAC_Manager:
                 "result": "failure",
                 "details": str(e)
             }
-            if logs_collection is not None:
-                logs_collection.insert_one(log_entry)
+            log_action(log_entry)
                 
             print(f" ❌  Authentication failed: {str(e)}")
             return False
 
-    def get_network_devices(self):
-        """Retrieves all network devices"""
+    def get_network_devices(self, record=True):
+        """Retrieves all network devices
+
+        With ``record`` the inventory also refreshes the dashboard
+        aggregates, which reads every device's contribution.
+        """
         if not self.token:
             print(" ⚠️  Please authenticate first!")
             return None
@@ -81,12 +88,13 @@ class DNAC_Manager:
         try:
             url = f"https://{DNAC['host']}:{DNAC['port']}/api/v1/network-device"
             headers = {"X-Auth-Token": self.token}
-            response = requests.get(
-                url,
-                headers=headers,
-                verify=False,
-                timeout=10
-            )
+            with span('fetch'):
+                response = self.transport.get(
+                    url,
+                    headers=headers,
+                    verify=False,
+                    timeout=10
+                )
             response.raise_for_status()
             
             # Log to MongoDB
@@ -96,10 +104,13 @@ class DNAC_Manager:
                 "result": "success",
                 "details": "Devices retrieved successfully"
             }
-            if logs_collection is not None:
-                logs_collection.insert_one(log_entry)
+            log_action(log_entry)
                 
-            return response.json().get('response', [])
+            with span('decode'):
+                devices = response.json().get('response', [])
+            if record:
+                update_dashboard(dnac_dashboard.record_devices, devices)
+            return devices
 
         except Exception as e:
             # Log to MongoDB
@@ -109,8 +120,7 @@ class DNAC_Manager:
                 "result": "failure",
                 "details": str(e)
             }
-            if logs_collection is not None:
-                logs_collection.insert_one(log_entry)
+            log_action(log_entry)
                 
             print(f" ❌  Failed to get devices: {str(e)}")
             return None
@@ -128,10 +138,10 @@ class DNAC_Manager:
 
         for device in devices:
             print(
-                f"{device.get('hostname', 'N/A'):20}"
-                f"{device.get('managementIpAddress', 'N/A'):15}"
-                f"{device.get('platformId', 'N/A'):20}"
-                f"{device.get('reachabilityStatus', 'N/A'):10}"
+                f"{device.get('hostname') or 'N/A':20}"
+                f"{device.get('managementIpAddress') or 'N/A':15}"
+                f"{device.get('platformId') or 'N/A':20}"
+                f"{device.get('reachabilityStatus') or 'N/A':10}"
             )
 
     def get_device_interfaces(self, device_ip):
@@ -141,8 +151,8 @@ class DNAC_Manager:
             return None
 
         try:
-            # Find device by IP
-            devices = self.get_network_devices()
+            # Find device by IP; a single lookup does not refresh the device aggregates
+            devices = self.get_network_devices(record=False)
             device = next(
                 (d for d in devices if d.get('managementIpAddress') == device_ip),
                 None
@@ -156,8 +166,7 @@ class DNAC_Manager:
                     "details": f"Device {device_ip} not found!",
                     "ip_address": device_ip
                 }
-                if logs_collection is not None:
-                    logs_collection.insert_one(log_entry)
+                log_action(log_entry)
                     
                 print(f" ❌  Device {device_ip} not found!")
                 return None
@@ -166,13 +175,14 @@ class DNAC_Manager:
             url = f"https://{DNAC['host']}:{DNAC['port']}/api/v1/interface"
             headers = {"X-Auth-Token": self.token}
             params = {"deviceId": device['id']}
-            response = requests.get(
-                url,
-                headers=headers,
-                params=params,
-                verify=False,
-                timeout=10
-            )
+            with span('fetch'):
+                response = self.transport.get(
+                    url,
+                    headers=headers,
+                    params=params,
+                    verify=False,
+                    timeout=10
+                )
             response.raise_for_status()
             
             # Log to MongoDB
@@ -183,10 +193,12 @@ class DNAC_Manager:
                 "details": f"Interfaces retrieved for device {device_ip}",
                 "ip_address": device_ip
             }
-            if logs_collection is not None:
-                logs_collection.insert_one(log_entry)
+            log_action(log_entry)
                 
-            return response.json().get('response', [])
+            with span('decode'):
+                interfaces = response.json().get('response', [])
+            update_dashboard(dnac_dashboard.record_interfaces, device['id'], interfaces)
+            return interfaces
 
         except Exception as e:
             # Log to MongoDB
@@ -197,12 +209,34 @@ class DNAC_Manager:
                 "details": str(e),
                 "ip_address": device_ip if 'device_ip' in locals() else None
             }
-            if logs_collection is not None:
-                logs_collection.insert_one(log_entry)
+            log_action(log_entry)
                 
             print(f" ❌  Failed to get interfaces: {str(e)}")
             return None
 
+    def get_interfaces_by_device_id(self, device_id):
+        """Retrieves interfaces for a known device id, raising on failure
+
+        Used by bulk operations that already hold the device list and log
+        a single summary entry themselves.
+        """
+        url = f"https://{DNAC['host']}:{DNAC['port']}/api/v1/interface"
+        headers = {"X-Auth-Token": self.token}
+        params = {"deviceId": device_id}
+        with span('fetch'):
+            response = self.transport.get(
+                url,
+                headers=headers,
+                params=params,
+                verify=False,
+                timeout=10
+            )
+        response.raise_for_status()
+        with span('decode'):
+            interfaces = response.json().get('response', [])
+        update_dashboard(dnac_dashboard.record_interfaces, device_id, interfaces)
+        return interfaces
+
     def display_interfaces(self, interfaces):
         """Formats interface output"""
         if not interfaces:
@@ -216,12 +250,23 @@ class DNAC_Manager:
 
         for intf in interfaces:
             print(
-                f"{intf.get('portName', 'N/A'):20}"
-                f"{intf.get('status', 'N/A'):10}"
-                f"{intf.get('vlanId', 'N/A'):10}"
-                f"{intf.get('speed', 'N/A'):10}"
+                f"{intf.get('portName') or 'N/A':20}"
+                f"{intf.get('status') or 'N/A':10}"
+                f"{intf.get('vlanId') or 'N/A':10}"
+                f"{intf.get('speed') or 'N/A':10}"
             )
 
+def dashboard_view(request):
+    """Device and interface health overview"""
+    context = {
+        'available': dnac_dashboard.dashboard_collection is not None
+    }
+    try:
+        context['summary'] = dnac_dashboard.get_summary()
+    except Exception as e:
+        context['error'] = str(e)
+    return render(request, 'dna_center_cisco/dashboard.html', context)
+
 def index(request):
     """Index page with menu options"""
     return render(request, 'dna_center_cisco/index.html')
@@ -286,8 +331,8 @@ def device_interfaces_view(request):
 
 def view_logs(request):
     """View MongoDB logs"""
-    if logs_collection is not None:
-        logs = list(logs_collection.find().sort("timestamp", -1).limit(50))
+    if logs_read_collection is not None:
+        logs = list(logs_read_collection.find().sort("timestamp", -1).limit(50))
         # Convert ObjectId to string for serialization
         for log in logs:
             log['_id'] = str(log['_id'])
@@ -297,4 +342,96 @@ def view_logs(request):
     context = {
         'logs': logs
     }
-    return render(request, 'dna_center_cisco/logs.html', context)
\ No newline at end of file
+    return render(request, 'dna_center_cisco/logs.html', context)
+
+def compliance_view(request):
+    """Take inventory snapshots and compare them"""
+    context = {}
+    if request.method == 'POST':
+        action = request.POST.get('action')
+        try:
+            if action == 'snapshot':
+                dnac = DNAC_Manager(priority=BACKGROUND, owner='compliance')
+                if not dnac.get_auth_token():
+                    context['error'] = 'Authentication failed'
+                else:
+                    snapshot = dnac_compliance.take_snapshot(dnac)
+                    if snapshot is None:
+                        context['error'] = 'Failed to retrieve devices'
+                    else:
+                        dnac_compliance.save_snapshot(snapshot)
+                        context['message'] = f"Snapshot {snapshot['id']} saved with {len(snapshot['devices'])} devices"
+                        if snapshot['failed']:
+                            context['message'] += f" ({len(snapshot['failed'])} failed and excluded from comparisons)"
+            elif action == 'diff':
+                old = dnac_compliance.load_snapshot(request.POST.get('old', ''))
+                new = dnac_compliance.load_snapshot(request.POST.get('new', ''))
+                report = dnac_compliance.diff_snapshots(old, new)
+                dnac_compliance.save_report(report)
+                return redirect('compliance_report', report_id=report['id'])
+            elif action == 'baseline':
+                snapshot = dnac_compliance.load_snapshot(request.POST.get('snapshot', ''))
+                baseline = json.load(request.FILES['baseline'])
+                report = dnac_compliance.check_baseline(snapshot, baseline)
+                dnac_compliance.save_report(report)
+                return redirect('compliance_report', report_id=report['id'])
+        except Exception as e:
+            context['error'] = str(e)
+
+        # Log to MongoDB
+        log_entry = {
+            "timestamp": datetime.utcnow(),
+            "action": f"compliance_{action}",
+            "result": "failure" if 'error' in context else "success",
+            "details": context.get('error') or context.get('message', '')
+        }
+        log_action(log_entry)
+
+    context['snapshots'] = dnac_compliance.list_snapshots()
+    context['reports'] = dnac_compliance.list_reports()
+    return render(request, 'dna_center_cisco/compliance.html', context)
+
+def compliance_report_view(request, report_id):
+    """Show or export a compliance report"""
+    try:
+        report = dnac_compliance.load_report(report_id)
+    except READ_ERRORS:
+        raise Http404(f"Report {report_id} not found")
+
+    export = request.GET.get('format')
+    if export == 'json':
+        response = JsonResponse(report)
+        response['Content-Disposition'] = f'attachment; filename="compliance-{report_id}.json"'
+        return response
+    if export == 'csv':
+        response = HttpResponse(dnac_compliance.report_to_csv(report), content_type='text/csv')
+        response['Content-Disposition'] = f'attachment; filename="compliance-{report_id}.csv"'
+        return response
+
+    context = {
+        'report': report
+    }
+    return render(request, 'dna_center_cisco/compliance_report.html', context)
+
+def profiles_view(request):
+    """List stored request profiles"""
+    context = {
+        'profiles': dnac_profiling.list_profiles()
+    }
+    return render(request, 'dna_center_cisco/profiles.html', context)
+
+def profile_collapsed_view(request, profile_id):
+    """Export a profile as collapsed stacks for flamegraph tools"""
+    try:
+        record = dnac_profiling.load_profile(profile_id)
+    except READ_ERRORS:
+        raise Http404(f"Profile {profile_id} not found")
+
+    response = HttpResponse(dnac_profiling.collapsed_stacks(record), content_type='text/plain')
+    response['Content-Disposition'] = f'attachment; filename="profile-{profile_id}.collapsed"'
+    return response
+
+
+def mongo_pool_view(request):
+    """Expose MongoDB connection pool metrics as JSON"""
+    return JsonResponse({'pools': pool_metrics.snapshot()})